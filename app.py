@@ -1,16 +1,19 @@
 import os
 import logging
-from flask import Flask, render_template, request, jsonify, url_for, flash, redirect, session, send_file
+from flask import Flask, render_template, request, jsonify, url_for, flash, redirect, session, send_file, Response, stream_with_context
 from werkzeug.utils import secure_filename
+import io
 import uuid
-import pandas as pd
 import json
 import tempfile
-import base64
-import io
-from utils.excel_processor import process_excel, get_column_types, validate_excel_file
-from utils.visualizations import generate_visualization
-from utils.export import export_to_pdf, export_to_excel
+from utils.excel_processor import process_excel, get_column_types, validate_excel_file, get_sheet_catalog, load_sheet, load_dataframe, get_filtered_rows, append_to_dataset
+from utils.column_stats import get_column_stats, append_column_stats, store_column_stats
+from utils.visualizations import generate_visualization, generate_crosstab_visualization, get_chart_template, CROSSTAB_VISUALIZATION_TYPES
+from utils.streaming import iter_csv, iter_parquet, parquet_schema, iter_buffer, parquet_available, STREAM_FORMATS
+from utils.http_cache import compute_file_hash, make_result_key, compress_response
+from utils import compute_backend
+from utils.result_store import result_store_uri, init_result_store, get_or_compute
+from utils.concurrency import single_flight, configure_route, run_admitted, RouteSaturated
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -25,6 +28,34 @@ app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024
 app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
 app.config['ALLOWED_EXTENSIONS'] = {'xlsx', 'xls', 'csv'}
 
+# Optional compute backend: COMPUTE_BACKEND=process runs filtering, value counts
+# and cross-tabs in a local process pool over datasets held in shared memory.
+# Ingest, time series, exports and downloads still load the dataset in the web
+# worker. COMPUTE_PROCESSES sets each web worker's pool size (by default the CPUs
+# are divided between the workers); COMPUTE_DATASET_TTL the seconds an unused
+# shared dataset is kept
+app.config['COMPUTE_BACKEND'] = os.environ.get('COMPUTE_BACKEND', 'inline')
+app.config['COMPUTE_PROCESSES'] = int(os.environ.get('COMPUTE_PROCESSES', '0')) or None
+app.config['COMPUTE_DATASET_TTL'] = int(os.environ.get('COMPUTE_DATASET_TTL', '1800'))
+compute_backend.configure(app.config['COMPUTE_BACKEND'] == 'process', app.config['COMPUTE_PROCESSES'],
+                          app.config['COMPUTE_DATASET_TTL'])
+
+# Computed results (column statistics and types, figures) persist across
+# restarts in a local SQLite database; set RESULT_STORE_URI to another
+# SQLAlchemy URI, or to an empty string to disable the store. The store is
+# opened by warmup() or the gunicorn hooks, not at import (see gunicorn.conf.py)
+app.config['SQLALCHEMY_DATABASE_URI'] = result_store_uri(app.instance_path)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_pre_ping': True}
+
+# Admission control for the heavy routes, per worker process: ROUTE_MAX_ACTIVE
+# computations of a route run at once, up to ROUTE_MAX_QUEUED more wait at most
+# ROUTE_QUEUE_TIMEOUT seconds, and anything beyond gets a 429 with Retry-After
+app.config['ROUTE_MAX_ACTIVE'] = int(os.environ.get('ROUTE_MAX_ACTIVE', '2'))
+app.config['ROUTE_MAX_QUEUED'] = int(os.environ.get('ROUTE_MAX_QUEUED', '8'))
+app.config['ROUTE_QUEUE_TIMEOUT'] = float(os.environ.get('ROUTE_QUEUE_TIMEOUT', '15'))
+for route_name in ('filter', 'analyze', 'export'):
+    configure_route(route_name, app.config['ROUTE_MAX_ACTIVE'], app.config['ROUTE_MAX_QUEUED'], app.config['ROUTE_QUEUE_TIMEOUT'])
+
 # Store temporary export files in memory
 export_files = {}
 
@@ -32,6 +63,68 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+def warmup():
+    """
+    Import the rendering and export stacks, build plotly's lazily-created
+    state and open the result store up front.
+    
+    Request handlers import these on first use, so calling this is optional;
+    without it (or the gunicorn hooks) computed results are not persisted. It
+    is meant to run once in the gunicorn master with --preload (see
+    gunicorn.conf.py) so every forked worker shares the loaded modules
+    copy-on-write instead of paying for them on its first request.
+    """
+    init_result_store(app)
+    
+    import plotly.graph_objects as go
+    import plotly.io as pio
+    import plotly.express as px
+    import utils.export
+    
+    # Templates and trace validators are loaded on first use; render one small
+    # figure of each kind the app produces to populate them
+    pio.templates['plotly_dark']
+    figures = [
+        px.pie(names=['a', 'b'], values=[1, 2], template='plotly_dark'),
+        px.bar(x=[1, 2], y=['a', 'b'], orientation='h', template='plotly_dark'),
+        px.treemap(names=['a', 'b'], parents=['', ''], values=[1, 2], template='plotly_dark'),
+        go.Figure(go.Heatmap(z=[[1, 2]]), layout=dict(template='plotly_dark')),
+        go.Figure(go.Scattergl(x=[1, 2], y=[1, 2]), layout=dict(template='plotly_dark'))
+    ]
+    for fig in figures:
+        pio.to_json(fig)
+    
+    logger.info("Warmup complete")
+
+def get_dataset_hash(file_path):
+    """Return the content hash of the uploaded dataset, computing it for sessions that predate hashing."""
+    dataset_hash = session.get('dataset_hash')
+    if not dataset_hash:
+        dataset_hash = compute_file_hash(file_path)
+        session['dataset_hash'] = dataset_hash
+    return dataset_hash
+
+def cacheable_json(payload, etag):
+    """Build a JSON response tagged with a (weak) ETag that clients must revalidate."""
+    response = jsonify(payload)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def saturated_response(error):
+    """Build the 429 response for a request rejected by a route's admission limit."""
+    response = jsonify({'error': 'The server is busy, please try again shortly'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def not_modified(etag):
+    """Build an empty 304 response confirming the client's cached copy is current."""
+    response = app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -52,21 +145,31 @@ def filter_data():
         if not file_path or not os.path.exists(file_path):
             return jsonify({'error': 'No file uploaded or file not found'}), 400
         
-        # Apply filters and get preview data
-        preview_data, columns, total_rows = process_excel(file_path, preview_rows=10, filters=filters)
+        # The filtered preview is fully determined by the dataset content and the filters
+        etag = make_result_key(get_dataset_hash(file_path), 'filter', filters)
+        if request.if_none_match.contains_weak(etag):
+            session['active_filters'] = filters
+            return not_modified(etag)
+        
+        # Apply filters and get preview data; concurrent identical requests share one computation
+        preview_data, columns, total_rows = single_flight(
+            etag, lambda: run_admitted('filter', lambda: process_excel(file_path, preview_rows=10, filters=filters))
+        )
         
         # Store filtered data in session
         session['active_filters'] = filters
-        session['filtered_preview_data'] = json.dumps(preview_data)
+        session['filtered_preview_data'] = json.dumps(preview_data, default=str)
         session['filtered_total_rows'] = total_rows
         
         # Return filtered data
-        return jsonify({
+        return cacheable_json({
             'preview_data': preview_data,
             'total_rows': total_rows,
             'message': f'Filtered data contains {total_rows} rows'
-        })
+        }, etag)
         
+    except RouteSaturated as e:
+        return saturated_response(e)
     except Exception as e:
         logger.error(f"Error filtering data: {str(e)}")
         logger.exception("Full filter error traceback:")
@@ -100,39 +203,117 @@ def upload_file():
             
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{session_id}_{filename}")
         file.save(file_path)
-        session['uploaded_file_path'] = file_path
         
-        try:
-            # Validate the file
-            validation_result = validate_excel_file(file_path)
-            if not validation_result['valid']:
-                flash(validation_result['message'], 'error')
+        return open_dataset(file_path, filename, append=request.form.get('append') == '1')
+    else:
+        flash('File type not allowed. Please upload .xlsx, .xls, or .csv files.', 'error')
+        return redirect(url_for('index'))
+
+@app.route('/select_sheet', methods=['POST'])
+def select_sheet():
+    file_path = session.get('workbook_path')
+    if not file_path or not os.path.exists(file_path):
+        flash('No file uploaded or file not found', 'error')
+        return redirect(url_for('index'))
+    
+    return open_dataset(file_path, session.get('filename', os.path.basename(file_path)),
+                        sheet_name=request.form.get('sheet_name'))
+
+def open_dataset(file_path, filename, sheet_name=None, append=False):
+    """
+    Make an uploaded file (one worksheet of it, for workbooks) the session's
+    active dataset and render the analysis page for it.
+    
+    Workbooks are catalogued from their metadata and only the selected sheet is
+    parsed; it defaults to the first sheet that has data. With append=True the
+    file's rows are added to the current dataset instead, after checking that
+    the schemas match, and the catalog is updated from the new rows only.
+    """
+    try:
+        sheets = get_sheet_catalog(file_path)
+        dataset_path = file_path
+        if sheets:
+            if not sheet_name:
+                sheet_name = next((sheet['name'] for sheet in sheets if sheet['rows']), sheets[0]['name'])
+            dataset_path = load_sheet(file_path, sheet_name)
+        
+        column_stats = None
+        if append:
+            current_path = session.get('uploaded_file_path')
+            if not current_path or not os.path.exists(current_path):
+                flash('No dataset to append to, please upload a file first', 'error')
                 return redirect(url_for('index'))
             
-            # Process the Excel file to get preview data
-            preview_data, columns, total_rows = process_excel(file_path, preview_rows=10)
-            column_types = get_column_types(file_path)
+            new_rows_path = dataset_path
+            current_hash = get_dataset_hash(current_path)
             
-            # Store data in session
-            session['preview_data'] = json.dumps(preview_data)
-            session['columns'] = columns
-            session['column_types'] = column_types
-            session['total_rows'] = total_rows
+            # Statistics are merged first: rows they reject leave the current dataset as it was
+            column_stats = append_column_stats(current_path, new_rows_path, current_hash)
+            dataset_path = append_to_dataset(current_path, new_rows_path)
             
-            # Return success with data
-            return render_template('index.html', 
-                                  preview_data=preview_data,
-                                  columns=columns,
-                                  column_types=column_types,
-                                  filename=filename,
-                                  total_rows=total_rows)
-        
-        except Exception as e:
-            logger.error(f"Error processing file: {str(e)}")
-            flash(f"Error processing file: {str(e)}", 'error')
+            # Chain the content hash so it only needs the new file
+            session['dataset_hash'] = make_result_key(current_hash, compute_file_hash(new_rows_path))
+            store_column_stats(dataset_path, column_stats, session['dataset_hash'])
+            filename = f"{session.get('filename', os.path.basename(current_path))} + {filename}"
+            
+            # The combined dataset no longer corresponds to a single workbook
+            session.pop('workbook_path', None)
+            sheets = []
+        else:
+            session['workbook_path'] = file_path
+            session['dataset_hash'] = compute_file_hash(dataset_path)
+        
+        # The previous dataset is no longer needed in shared memory
+        previous_path = session.get('uploaded_file_path')
+        if compute_backend.is_enabled() and previous_path and previous_path != dataset_path:
+            compute_backend.release_dataset(previous_path)
+        
+        session['filename'] = filename
+        session['sheet_name'] = sheet_name
+        session['uploaded_file_path'] = dataset_path
+        
+        # Filters refer to the columns of the previous dataset
+        session['active_filters'] = {}
+        
+        # Validate the file
+        validation_result = validate_excel_file(dataset_path)
+        if not validation_result['valid']:
+            flash(validation_result['message'], 'error')
             return redirect(url_for('index'))
-    else:
-        flash('File type not allowed. Please upload .xlsx, .xls, or .csv files.', 'error')
+        
+        # Build the statistics catalog once at ingest; exports and filter hints reuse it.
+        # A dataset with the same content may have been profiled before a restart
+        dataset_hash = session['dataset_hash']
+        if column_stats is None:
+            column_stats = get_column_stats(dataset_path, dataset_hash)
+        
+        # Process the Excel file to get preview data
+        preview_data, columns, total_rows = process_excel(dataset_path, preview_rows=10)
+        column_types = get_or_compute(
+            'column_types', dataset_hash, [],
+            lambda: get_column_types(dataset_path, column_stats=column_stats)
+        )
+        
+        # Store data in session
+        session['preview_data'] = json.dumps(preview_data, default=str)
+        session['columns'] = columns
+        session['column_types'] = column_types
+        session['total_rows'] = total_rows
+        
+        # Return success with data
+        return render_template('index.html', 
+                              preview_data=preview_data,
+                              columns=columns,
+                              column_types=column_types,
+                              column_stats=column_stats,
+                              sheets=sheets,
+                              selected_sheet=sheet_name,
+                              filename=filename,
+                              total_rows=total_rows)
+    
+    except Exception as e:
+        logger.error(f"Error processing file: {str(e)}")
+        flash(f"Error processing file: {str(e)}", 'error')
         return redirect(url_for('index'))
 
 @app.route('/analyze', methods=['POST', 'GET'])
@@ -146,9 +327,13 @@ def analyze():
         logger.debug(f"Received data: {data}")
         
         field = data.get('field')
+        secondary_field = data.get('secondary_field')
+        interval = data.get('interval') or None
         visualization_types = data.get('visualization_types', [])
+        # Compact charts carry only their aggregated arrays; see /chart_template
+        compact = bool(data.get('compact'))
         
-        logger.debug(f"Field: {field}, Visualization Types: {visualization_types}")
+        logger.debug(f"Field: {field}, Secondary Field: {secondary_field}, Visualization Types: {visualization_types}")
         
         if not field or not visualization_types:
             logger.error("Field or visualization types missing")
@@ -162,27 +347,84 @@ def analyze():
             logger.error(f"File not found: {file_path}")
             return jsonify({'error': 'No file uploaded or file not found'}), 400
         
-        # Generate visualizations
-        results = {}
-        for viz_type in visualization_types:
-            try:
-                logger.debug(f"Generating {viz_type} visualization for field: {field}")
-                viz_data = generate_visualization(file_path, field, viz_type)
-                results[viz_type] = viz_data
-                logger.debug(f"Successfully generated {viz_type}")
-            except Exception as e:
-                logger.error(f"Error generating {viz_type} visualization: {str(e)}")
-                logger.exception("Full traceback:")
-                results[viz_type] = {'error': str(e)}
+        # Every visualization is computed from the filtered view of the dataset
+        active_filters = session.get('active_filters')
+        
+        # Identical requests against the same dataset content produce identical figures
+        etag = make_result_key(
+            get_dataset_hash(file_path), 'analyze', field, secondary_field, interval,
+            visualization_types, active_filters, compact
+        )
+        if request.if_none_match.contains_weak(etag):
+            logger.debug(f"Analysis result {etag} unchanged, returning 304")
+            return not_modified(etag)
+        
+        def build_visualization(viz_type):
+            if viz_type in CROSSTAB_VISUALIZATION_TYPES:
+                if not secondary_field:
+                    raise ValueError(f"A second field is required for {viz_type}")
+                logger.debug(f"Generating {viz_type} visualization for fields: {field}, {secondary_field}")
+                return generate_crosstab_visualization(
+                    file_path, field, secondary_field, viz_type, filters=active_filters
+                )
+            logger.debug(f"Generating {viz_type} visualization for field: {field}")
+            return generate_visualization(
+                file_path, field, viz_type, interval=interval, compact=compact, filters=active_filters
+            )
+        
+        # Generate visualizations, reusing figures stored for the same dataset content.
+        # Failures raise and are therefore never stored
+        def build_results():
+            results = {}
+            for viz_type in visualization_types:
+                try:
+                    viz_data = get_or_compute(
+                        'visualization', get_dataset_hash(file_path),
+                        [viz_type, field, secondary_field, interval, active_filters, compact],
+                        lambda: build_visualization(viz_type)
+                    )
+                    results[viz_type] = viz_data
+                    logger.debug(f"Successfully generated {viz_type}")
+                except Exception as e:
+                    logger.error(f"Error generating {viz_type} visualization: {str(e)}")
+                    logger.exception("Full traceback:")
+                    results[viz_type] = {'error': str(e)}
+            return results
+        
+        # Identical requests arriving while this one computes (double clicks,
+        # several tabs) wait for it and share its results without taking a slot
+        results = single_flight(etag, lambda: run_admitted('analyze', build_results))
         
         logger.debug(f"Returning results for {len(results)} visualizations")
-        return jsonify(results)
+        return cacheable_json(results, etag)
     
+    except RouteSaturated as e:
+        return saturated_response(e)
     except Exception as e:
         logger.error(f"Error in analyze: {str(e)}")
         logger.exception("Full traceback:")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/chart_template')
+def chart_template():
+    """
+    Serve the plotly template that the browser applies to compact charts.
+    
+    It only changes with the plotly version, so clients fetch it once and
+    revalidate it cheaply afterwards.
+    """
+    import plotly
+    
+    etag = make_result_key('chart_template', plotly.__version__)
+    if request.if_none_match.contains_weak(etag):
+        return not_modified(etag)
+    
+    try:
+        return cacheable_json({'template': get_chart_template()}, etag)
+    except Exception as e:
+        logger.error(f"Error loading chart template: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/export', methods=['POST', 'GET'])
 def export():
     if request.method == 'GET':
@@ -209,44 +451,87 @@ def export():
             logger.error(f"File not found for export: {file_path}")
             return jsonify({'error': 'No file uploaded or file not found'}), 400
         
-        # Generate a unique file ID
-        file_id = str(uuid.uuid4())
+        # The export stack (reportlab, plotly image export) is only needed here
+        from utils.export import export_to_pdf, export_to_excel, PDF_TABLE_TOP_N
+        
+        # Frequency tables in PDF reports list the top_n values plus an 'Others' row
+        top_n = data.get('top_n')
+        if top_n is None:
+            top_n = PDF_TABLE_TOP_N
+        elif isinstance(top_n, str) and top_n.strip().isdigit():
+            top_n = int(top_n)
+        if isinstance(top_n, bool) or not isinstance(top_n, int) or top_n < 1:
+            logger.error(f"Invalid top_n for export: {top_n!r}")
+            return jsonify({'error': 'top_n must be a positive integer'}), 400
+        stream = export_type == 'pdf' and bool(data.get('stream'))
+        
+        # Exports cover the rows matching the session's filters, like /analyze
+        active_filters = session.get('active_filters')
+        
+        if export_type not in ('pdf', 'excel'):
+            logger.error(f"Invalid export type: {export_type}")
+            return jsonify({'error': 'Invalid export type'}), 400
         
-        # Create a temporary directory for exports if it doesn't exist
-        export_dir = os.path.join(tempfile.gettempdir(), 'data_insight_exports')
-        os.makedirs(export_dir, exist_ok=True)
+        # Identical exports requested while one is being built share its output
+        export_key = make_result_key(
+            get_dataset_hash(file_path), 'export', export_type, fields, visualizations, top_n, stream, active_filters
+        )
         
-        # Export based on selected type
-        if export_type == 'pdf':
-            logger.debug("Exporting to PDF")
-            output_path = os.path.join(export_dir, f'data_analysis_{file_id}.pdf')
-            export_to_pdf(file_path, fields, visualizations, output_path)
+        # With stream=True the PDF is built in memory and returned in this
+        # response, so no export file or download registry entry is needed
+        if stream:
+            def build_pdf():
+                logger.debug("Streaming PDF export")
+                buffer = io.BytesIO()
+                export_to_pdf(file_path, fields, visualizations, buffer, top_n=top_n, filters=active_filters)
+                return buffer
             
-            # Store file info in memory dictionary
-            export_files[file_id] = {
-                'path': output_path,
-                'type': 'application/pdf',
-                'filename': f'data_analysis_{file_id}.pdf'
-            }
+            # Every response sharing the build streams from the same buffer; it
+            # is never written to again, so no copy is needed
+            pdf_buffer = single_flight(export_key, lambda: run_admitted('export', build_pdf))
+            response = Response(iter_buffer(pdf_buffer), mimetype='application/pdf')
+            response.headers['Content-Length'] = str(pdf_buffer.getbuffer().nbytes)
+            response.headers['Content-Disposition'] = f'attachment; filename="data_analysis_{uuid.uuid4()}.pdf"'
+            return response
+        
+        def build_export():
+            # Generate a unique file ID
+            file_id = str(uuid.uuid4())
             
-        elif export_type == 'excel':
-            logger.debug("Exporting to Excel")
-            output_path = os.path.join(export_dir, f'data_analysis_{file_id}.xlsx')
-            export_to_excel(file_path, fields, visualizations, output_path)
+            # Create a temporary directory for exports if it doesn't exist
+            export_dir = os.path.join(tempfile.gettempdir(), 'data_insight_exports')
+            os.makedirs(export_dir, exist_ok=True)
             
-            # Store file info in memory dictionary
-            export_files[file_id] = {
-                'path': output_path,
-                'type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                'filename': f'data_analysis_{file_id}.xlsx'
-            }
-        else:
-            logger.error(f"Invalid export type: {export_type}")
-            return jsonify({'error': 'Invalid export type'}), 400
+            # Export based on selected type
+            if export_type == 'pdf':
+                logger.debug("Exporting to PDF")
+                output_path = os.path.join(export_dir, f'data_analysis_{file_id}.pdf')
+                export_to_pdf(file_path, fields, visualizations, output_path, top_n=top_n, filters=active_filters)
+                
+                # Store file info in memory dictionary
+                export_files[file_id] = {
+                    'path': output_path,
+                    'type': 'application/pdf',
+                    'filename': f'data_analysis_{file_id}.pdf'
+                }
+            else:
+                logger.debug("Exporting to Excel")
+                output_path = os.path.join(export_dir, f'data_analysis_{file_id}.xlsx')
+                export_to_excel(file_path, fields, visualizations, output_path, filters=active_filters)
+                
+                # Store file info in memory dictionary
+                export_files[file_id] = {
+                    'path': output_path,
+                    'type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                    'filename': f'data_analysis_{file_id}.xlsx'
+                }
+            return file_id
         
         # Return the file ID for download
-        return jsonify({'file_id': file_id})
+        return jsonify({'file_id': single_flight(export_key, lambda: run_admitted('export', build_export))})
     
+    except RouteSaturated as e:
+        return saturated_response(e)
     except Exception as e:
         logger.error(f"Error in export: {str(e)}")
         logger.exception("Full export error traceback:")
@@ -275,6 +560,51 @@ def download_file(file_id):
         download_name=file_data['filename']
     )
 
+@app.route('/download_filtered')
+def download_filtered():
+    export_format = request.args.get('format', 'csv')
+    if export_format not in STREAM_FORMATS:
+        return jsonify({'error': f'Unsupported download format: {export_format}'}), 400
+    if export_format == 'parquet' and not parquet_available():
+        return jsonify({'error': 'Parquet downloads require the pyarrow package'}), 400
+    
+    file_path = session.get('uploaded_file_path')
+    if not file_path or not os.path.exists(file_path):
+        flash('No file uploaded or file not found', 'error')
+        return redirect(url_for('index'))
+    
+    try:
+        # Rows of the filtered view over the cached dataset are written in
+        # batches, so the filtered data is never materialized as a second copy
+        df = load_dataframe(file_path)
+        rows = get_filtered_rows(file_path, session.get('active_filters'))
+        logger.debug(f"Streaming {len(df) if rows is None else len(rows)} filtered rows as {export_format}")
+        
+        # The Parquet schema is fixed before the response starts, so columns that
+        # cannot be written fail here with an error instead of truncating the file
+        if export_format == 'parquet':
+            generator = iter_parquet(df, rows, parquet_schema(df))
+        else:
+            generator = iter_csv(df, rows)
+    except Exception as e:
+        logger.error(f"Error preparing filtered download: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    
+    format_info = STREAM_FORMATS[export_format]
+    base_name = os.path.splitext(session.get('filename', 'data'))[0]
+    download_name = f"{base_name}_filtered.{format_info['extension']}"
+    
+    return Response(
+        stream_with_context(generator),
+        mimetype=format_info['mimetype'],
+        headers={'Content-Disposition': f'attachment; filename="{download_name}"'}
+    )
+
+# Compress large text responses for clients that accept it
+@app.after_request
+def compress(response):
+    return compress_response(response, request.accept_encodings)
+
 # Clean up expired files periodically
 @app.before_request
 def cleanup_expired_files():
@@ -0,0 +1,37 @@
+# Gunicorn configuration for Data Insight Analyzer.
+#
+# The app is loaded once in the master (preload_app) and warmed up before the
+# workers are forked, so heavy modules and plotly's templates are shared
+# copy-on-write and new workers can start serving immediately.
+import os
+
+wsgi_app = 'main:app'
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+def on_starting(server):
+    # Create the result store's table and prune it once here rather than in
+    # every worker; this does not import the application
+    from utils.result_store import maintain_result_store, result_store_uri
+    maintain_result_store(result_store_uri(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')))
+    
+    # With preload_app the application module is already imported at this point
+    if server.cfg.preload_app:
+        from app import warmup
+        warmup()
+
+def post_worker_init(worker):
+    # Open the result store before the first request; warmup() already did
+    # when the app was preloaded
+    from app import app
+    from utils.result_store import init_result_store
+    init_result_store(app)
+    
+    # Start the compute pool (COMPUTE_BACKEND=process) before the first request
+    from utils import compute_backend
+    if compute_backend.is_enabled():
+        # Every worker has its own pool; divide the CPUs between them
+        compute_backend.set_web_workers(worker.cfg.workers)
+        compute_backend.start_pool()
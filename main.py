@@ -1,4 +1,7 @@
-from app import app
+from app import app, warmup
+from utils.result_store import maintain_result_store
 
 if __name__ == "__main__":
+    maintain_result_store(app.config['SQLALCHEMY_DATABASE_URI'])
+    warmup()
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,443 @@
+"""
+Concurrent load test for Data Insight Analyzer.
+
+Starts the app under gunicorn (using gunicorn.conf.py) with the requested
+number of workers and threads, then replays complete user sessions through the
+HTTP routes from several concurrent virtual users: upload a synthetic dataset,
+apply a sequence of filters, request a multi-visualization analysis, export a
+PDF or Excel report, download it and stream the filtered data. Run it from the
+repository root:
+    
+    python scripts/loadtest.py [--workers N] [--threads N] [--users N] [--sessions N]
+
+Prints throughput, p50/p95/p99 latency and error rates per route, plus the
+resident memory of the gunicorn processes sampled over the run. Use --url to
+load an already running server instead; memory is then not sampled. Exits with
+status 1 when any request failed.
+"""
+import argparse
+import csv
+import http.cookiejar
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REGIONS = ['North', 'South', 'East', 'West', 'Central']
+CHANNELS = ['Online', 'Retail', 'Partner']
+
+# Visualizations requested by every session's analysis step
+ANALYZE_TYPES = ['frequency_table', 'pie_chart', 'bar_chart', 'treemap']
+CROSSTAB_TYPES = ['heatmap', 'stacked_bar']
+
+# Lines of gunicorn's stderr kept for the message when it fails to start
+STDERR_TAIL_LINES = 50
+
+EXPORT_MIMETYPES = {
+    'pdf': 'application/pdf',
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+def generate_dataset(path, rows, seed=0):
+    """
+    Write a synthetic sales dataset as CSV.
+    
+    Columns cover each type the app distinguishes: low-cardinality categories,
+    a high-cardinality text field, numeric amounts and order dates.
+    """
+    rng = random.Random(seed)
+    start = datetime(2022, 1, 1)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['region', 'channel', 'product', 'customer', 'amount', 'quantity', 'order_date'])
+        for _ in range(rows):
+            writer.writerow([
+                rng.choice(REGIONS),
+                rng.choice(CHANNELS),
+                f"P{int(rng.paretovariate(1.2)) % 200:03d}",
+                f"C{rng.randrange(rows // 4 + 1):06d}",
+                round(rng.lognormvariate(4, 1), 2),
+                rng.randint(1, 20),
+                (start + timedelta(minutes=rng.randrange(2 * 365 * 24 * 60))).strftime('%Y-%m-%d %H:%M:%S')
+            ])
+
+class Recorder:
+    """Thread-safe collection of request timings, keyed by route."""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.error_messages = {}
+    
+    def add(self, route, seconds, error=None):
+        with self.lock:
+            self.samples.setdefault(route, []).append(seconds)
+            if error:
+                self.errors[route] = self.errors.get(route, 0) + 1
+                messages = self.error_messages.setdefault(route, {})
+                messages[error] = messages.get(error, 0) + 1
+
+class VirtualUser:
+    """One browser session: its own cookie jar, replaying the app's workflow."""
+    
+    def __init__(self, base_url, recorder, dataset_path, rng):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.dataset_path = dataset_path
+        self.rng = rng
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+    
+    def request(self, route, path, body=None, headers=None, check=None):
+        """
+        Send one request and record its latency under a route label.
+        
+        Returns the response (status, headers, body), or None when the request
+        failed. check(status, headers, body) may return an error message for
+        responses that succeeded at the HTTP level but are wrong.
+        """
+        request = urllib.request.Request(self.base_url + path, data=body, headers=headers or {})
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=300) as response:
+                result = (response.status, response.headers, response.read())
+        except urllib.error.HTTPError as e:
+            result = (e.code, e.headers, e.read())
+        except Exception as e:
+            self.recorder.add(route, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+            return None
+        elapsed = time.perf_counter() - start
+        
+        status, response_headers, response_body = result
+        error = f"HTTP {status}" if status >= 400 else None
+        if error is None and check is not None:
+            error = check(status, response_headers, response_body)
+        self.recorder.add(route, elapsed, error)
+        return None if error else result
+    
+    def post_json(self, route, path, payload, check=None):
+        body = json.dumps(payload).encode('utf-8')
+        result = self.request(route, path, body, {'Content-Type': 'application/json'}, check or _check_json)
+        return json.loads(result[2]) if result else None
+    
+    def upload(self):
+        boundary = uuid.uuid4().hex
+        with open(self.dataset_path, 'rb') as f:
+            content = f.read()
+        body = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{os.path.basename(self.dataset_path)}"\r\n'
+            f"Content-Type: text/csv\r\n\r\n"
+        ).encode('utf-8') + content + f"\r\n--{boundary}--\r\n".encode('utf-8')
+        headers = {'Content-Type': f"multipart/form-data; boundary={boundary}"}
+        # A successful upload renders the analysis page; failures redirect to the index
+        return self.request('POST /upload', '/upload', body, headers, _check_upload) is not None
+    
+    def run_session(self, filter_steps):
+        if not self.upload():
+            return
+        
+        # Narrow the data step by step, as a user refining a view would
+        filters = {}
+        for _ in range(filter_steps):
+            choice = self.rng.random()
+            if choice < 0.4:
+                filters['region'] = self.rng.choice(REGIONS)
+            elif choice < 0.8:
+                low = self.rng.choice([10, 25, 50, 100])
+                filters['amount'] = {'min': low, 'max': low * self.rng.choice([2, 5, 10])}
+            else:
+                filters['product'] = {'contains': str(self.rng.randrange(10))}
+            self.post_json('POST /filter', '/filter', {'filters': filters})
+        
+        field = self.rng.choice(['region', 'channel', 'product'])
+        self.post_json('POST /analyze', '/analyze', {
+            'field': field,
+            'visualization_types': ANALYZE_TYPES,
+        }, _check_analyze)
+        self.post_json('POST /analyze (cross-tab)', '/analyze', {
+            'field': field,
+            'secondary_field': 'channel' if field != 'channel' else 'region',
+            'visualization_types': CROSSTAB_TYPES,
+        }, _check_analyze)
+        self.post_json('POST /analyze (time series)', '/analyze', {
+            'field': 'order_date',
+            'visualization_types': ['time_series'],
+        }, _check_analyze)
+        
+        export_type = self.rng.choice(list(EXPORT_MIMETYPES))
+        exported = self.post_json('POST /export', '/export', {
+            'export_type': export_type,
+            'fields': [field],
+            'visualizations': [
+                {'field': field, 'type': 'frequency_table'},
+                {'field': field, 'type': 'bar_chart'}
+            ]
+        })
+        if exported and 'file_id' in exported:
+            mimetype = EXPORT_MIMETYPES[export_type]
+            self.request(
+                'GET /download/<file_id>', f"/download/{exported['file_id']}",
+                check=lambda status, headers, body: _check_mimetype(headers, mimetype)
+            )
+        
+        self.request(
+            'GET /download_filtered', '/download_filtered?format=csv',
+            check=lambda status, headers, body: _check_mimetype(headers, 'text/csv')
+        )
+
+def _check_json(status, headers, body):
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return 'response is not JSON'
+    if isinstance(payload, dict) and 'error' in payload:
+        return f"error: {payload['error'][:80]}"
+    return None
+
+def _check_analyze(status, headers, body):
+    error = _check_json(status, headers, body)
+    if error:
+        return error
+    for viz_type, result in json.loads(body).items():
+        if isinstance(result, dict) and 'error' in result:
+            return f"{viz_type}: {result['error'][:80]}"
+    return None
+
+def _check_upload(status, headers, body):
+    return None if b'id="generateBtn"' in body else 'upload did not render the analysis page'
+
+def _check_mimetype(headers, mimetype):
+    received = (headers.get('Content-Type') or '').split(';')[0]
+    if received != mimetype:
+        # Missing exports redirect to the index page
+        return f"expected {mimetype}, got {received or 'no content type'}"
+    return None
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(workers, threads, port, backend):
+    """Start gunicorn with the repository's configuration and wait until it serves."""
+    env = dict(
+        os.environ,
+        BIND=f"127.0.0.1:{port}",
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_THREADS=str(threads),
+        COMPUTE_BACKEND=backend
+    )
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--log-level', 'warning'],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+    
+    # The app logs to stderr; keep reading it so gunicorn never blocks on a
+    # full pipe, and keep the last lines for the error message
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    reader = threading.Thread(target=stderr_tail.extend, args=(process.stderr,), daemon=True)
+    reader.start()
+    
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            reader.join(timeout=5)
+            raise RuntimeError(f"gunicorn exited: {b''.join(stderr_tail).decode(errors='replace')[-2000:]}")
+        try:
+            urllib.request.urlopen(base_url + '/', timeout=2).read()
+            return process, base_url
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start serving within 120 seconds')
+
+def _children(pid):
+    """Direct child process ids of a process, read from /proc."""
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The parent pid is the second field after the parenthesized command
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return children
+
+def _memory_kb(pid):
+    """Return (rss, pss) of a process in kB; pss is None where not available."""
+    rss = pss = None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    rss = int(line.split()[1])
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    pss = int(line.split()[1])
+    except OSError:
+        pass
+    return rss or 0, pss
+
+class MemorySampler(threading.Thread):
+    """
+    Periodically sample the memory of the gunicorn master and of each worker.
+    
+    A worker's figure includes its own children (e.g. compute pool processes).
+    RSS counts shared pages once per process; PSS splits them between the
+    processes sharing them, so the PSS total is the real footprint.
+    """
+    
+    def __init__(self, master_pid, interval):
+        super().__init__(daemon=True)
+        self.master_pid = master_pid
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+    
+    def sample(self):
+        processes = {'master': [self.master_pid]}
+        for worker in _children(self.master_pid):
+            descendants, pending = [worker], [worker]
+            while pending:
+                children = _children(pending.pop())
+                descendants += children
+                pending += children
+            processes[f"worker {worker}"] = descendants
+        
+        rss, pss = {}, 0
+        for name, pids in processes.items():
+            memory = [_memory_kb(pid) for pid in pids]
+            rss[name] = sum(value for value, _ in memory)
+            pss += sum(value or 0 for _, value in memory)
+        return rss, pss
+    
+    def run(self):
+        start = time.monotonic()
+        while not self.stopped.is_set():
+            rss, pss = self.sample()
+            self.samples.append((time.monotonic() - start, rss, pss))
+            self.stopped.wait(self.interval)
+
+def print_report(recorder, elapsed, sampler):
+    print(f"\n{'Route':<30}{'count':>7}{'errors':>8}{'err %':>7}{'req/s':>8}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    print('-' * 96)
+    total, total_errors = 0, 0
+    for route, samples in recorder.samples.items():
+        errors = recorder.errors.get(route, 0)
+        total += len(samples)
+        total_errors += errors
+        timings = [value * 1000 for value in samples]
+        print(f"{route:<30}{len(samples):>7}{errors:>8}{errors / len(samples) * 100:>7.1f}"
+              f"{len(samples) / elapsed:>8.2f}{statistics.median(timings):>9.0f}"
+              f"{percentile(timings, 0.95):>9.0f}{percentile(timings, 0.99):>9.0f}{max(timings):>9.0f}")
+    print('-' * 96)
+    print(f"{'all routes':<30}{total:>7}{total_errors:>8}"
+          f"{(total_errors / total * 100) if total else 0:>7.1f}{total / elapsed:>8.2f}")
+    print(f"\nWall time {elapsed:.1f} s")
+    
+    for route, messages in recorder.error_messages.items():
+        print(f"\nErrors on {route}:")
+        for message, count in sorted(messages.items(), key=lambda item: -item[1]):
+            print(f"  {count:>5} x {message}")
+    
+    if sampler and sampler.samples:
+        names = sorted({name for _, rss, _ in sampler.samples for name in rss}, key=lambda name: name != 'master')
+        print('\nResident memory (MB) over time')
+        print(f"{'t (s)':>7}" + ''.join(f"{name:>16}" for name in names) + f"{'RSS total':>12}{'PSS total':>12}")
+        step = max(1, len(sampler.samples) // 20)
+        for t, rss, pss in sampler.samples[::step] + sampler.samples[-1:]:
+            row = ''.join(f"{rss.get(name, 0) / 1024:>16.0f}" for name in names)
+            print(f"{t:>7.1f}{row}{sum(rss.values()) / 1024:>12.0f}{pss / 1024:>12.0f}")
+    
+    return total_errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes (default: 2)')
+    parser.add_argument('--threads', type=int, default=1, help='Threads per worker (default: 1)')
+    parser.add_argument('--backend', choices=['inline', 'process'], default='inline',
+                        help='Compute backend, see COMPUTE_BACKEND in app.py (default: inline)')
+    parser.add_argument('--users', type=int, default=4, help='Concurrent virtual users (default: 4)')
+    parser.add_argument('--sessions', type=int, default=3, help='Sessions replayed by each user (default: 3)')
+    parser.add_argument('--filters', type=int, default=4, help='Filter requests per session (default: 4)')
+    parser.add_argument('--rows', type=int, default=100000, help='Rows in the synthetic dataset (default: 100000)')
+    parser.add_argument('--sample-interval', type=float, default=1.0, help='Seconds between memory samples (default: 1)')
+    parser.add_argument('--url', help='Load an already running server at this base URL instead of starting one')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the dataset and sessions (default: 0)')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        dataset_path = os.path.join(directory, 'loadtest_sales.csv')
+        generate_dataset(dataset_path, args.rows, args.seed)
+        print(f"Dataset: {args.rows} rows, {os.path.getsize(dataset_path) / 1024 / 1024:.1f} MB")
+        
+        server, sampler = None, None
+        if args.url:
+            base_url = args.url.rstrip('/')
+        else:
+            server, base_url = start_server(args.workers, args.threads, _free_port(), args.backend)
+            sampler = MemorySampler(server.pid, args.sample_interval)
+            sampler.start()
+            print(f"gunicorn: {args.workers} workers x {args.threads} threads, {args.backend} backend, {base_url}")
+        
+        print(f"Load: {args.users} users x {args.sessions} sessions, {args.filters} filters per session")
+        
+        recorder = Recorder()
+        
+        def run_user(index):
+            user = VirtualUser(base_url, recorder, dataset_path, random.Random(args.seed * 1000 + index))
+            for _ in range(args.sessions):
+                user.run_session(args.filters)
+        
+        try:
+            start = time.perf_counter()
+            users = [threading.Thread(target=run_user, args=(index,)) for index in range(args.users)]
+            for user in users:
+                user.start()
+            for user in users:
+                user.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            if sampler:
+                sampler.stopped.set()
+                sampler.join()
+            if server:
+                server.terminate()
+                server.wait(timeout=30)
+    
+    errors = print_report(recorder, elapsed, sampler)
+    sys.exit(1 if errors else 0)
+
+if __name__ == '__main__':
+    main()
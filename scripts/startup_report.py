@@ -0,0 +1,70 @@
+"""
+Startup-time report for Data Insight Analyzer.
+
+Measures, in fresh interpreter processes, how long it takes to import the app,
+to run warmup(), and to import each heavy dependency on its own. Run it from
+the repository root:
+    
+    python scripts/startup_report.py [--runs N]
+
+The "import app" line is what every non-preloaded worker pays at boot; the
+warmup line is paid once in the gunicorn master when preload_app is enabled.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (label, setup statement run before timing, statement being timed)
+MEASUREMENTS = [
+    ('import app', '', 'import app'),
+    ('import app + warmup()', '', 'import app; app.warmup()'),
+    ('warmup() after import', 'import app', 'app.warmup()'),
+    ('import pandas', '', 'import pandas'),
+    ('import flask', '', 'import flask'),
+    ('import plotly.express', '', 'import plotly.express'),
+    ('import reportlab.platypus', '', 'import reportlab.platypus'),
+    ('import utils.export', '', 'import utils.export'),
+]
+
+TIMER = '''
+import logging, time
+logging.disable(logging.CRITICAL)
+{setup}
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+'''
+
+def time_statement(setup, statement):
+    """Run a statement in a fresh interpreter and return its wall time in seconds."""
+    code = TIMER.format(setup=setup, statement=statement)
+    output = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Fresh processes per measurement (default: 5)')
+    args = parser.parse_args()
+    
+    print(f"{'Measurement':<28}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    print('-' * 60)
+    for label, setup, statement in MEASUREMENTS:
+        try:
+            timings = [time_statement(setup, statement) * 1000 for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print(f"{label:<28}{'failed':>12}  {e.stderr.strip().splitlines()[-1]}")
+            continue
+        print(f"{label:<28}{statistics.median(timings):>12.1f}{min(timings):>10.1f}{max(timings):>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,7 @@
 // Store application state
 const appState = {
     selectedField: null,
+    secondaryField: null,
     selectedVisualizations: [],
     generatedVisualizations: {},
     exportConfig: {
@@ -16,6 +17,162 @@ const appState = {
     activeFilters: {}
 };
 
+// Responses from /analyze and /filter with their ETags, keyed by URL and request body
+const responseCache = new Map();
+
+/**
+ * POST a JSON request, revalidating any cached response with If-None-Match.
+ * Resolves with the response data, reusing the cached copy on 304 Not Modified.
+ */
+function postJsonCached(url, payload) {
+    const body = JSON.stringify(payload);
+    const cacheKey = `${url} ${body}`;
+    const cached = responseCache.get(cacheKey);
+    
+    const headers = {
+        'Content-Type': 'application/json',
+    };
+    if (cached) {
+        headers['If-None-Match'] = cached.etag;
+    }
+    
+    return fetch(url, {
+        method: 'POST',
+        headers: headers,
+        body: body
+    })
+    .then(response => {
+        if (response.status === 304 && cached) {
+            return cached.data;
+        }
+        if (!response.ok) {
+            return response.json().catch(() => ({})).then(data => {
+                throw new Error(data.error || `Request failed with status ${response.status}`);
+            });
+        }
+        return response.json().then(data => {
+            const etag = response.headers.get('ETag');
+            if (etag) {
+                responseCache.set(cacheKey, { etag: etag, data: data });
+            }
+            return data;
+        });
+    });
+}
+
+// Plotly template applied to compact charts, fetched once per page
+let chartTemplatePromise = null;
+
+/**
+ * Get the chart template served by /chart_template, fetching it on first use
+ */
+function getChartTemplate() {
+    if (!chartTemplatePromise) {
+        chartTemplatePromise = fetch('/chart_template')
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`Chart template request failed with status ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => data.template)
+        .catch(error => {
+            // Allow a later chart to retry
+            chartTemplatePromise = null;
+            throw error;
+        });
+    }
+    return chartTemplatePromise;
+}
+
+// plotly's qualitative 'Bold' palette, used for treemap tiles
+const TREEMAP_COLORS = [
+    'rgb(127, 60, 141)', 'rgb(17, 165, 121)', 'rgb(57, 105, 172)', 'rgb(242, 183, 1)',
+    'rgb(231, 63, 116)', 'rgb(128, 186, 90)', 'rgb(230, 131, 16)', 'rgb(0, 134, 149)',
+    'rgb(207, 28, 144)', 'rgb(249, 123, 114)', 'rgb(165, 170, 153)'
+];
+
+const CHART_MARGIN = { l: 20, r: 20, t: 40, b: 20 };
+
+/**
+ * Builders for compact chart payloads, keyed by the spec id sent by the server
+ * (COMPACT_CHART_SPECS in utils/visualizations.py). Each returns the same
+ * figure the server would have sent in full, without the template.
+ */
+const compactChartSpecs = {
+    'pie_chart@1': chart => ({
+        data: [{
+            type: 'pie',
+            labels: chart.labels,
+            values: chart.counts,
+            hovertemplate: 'label=%{label}<br>value=%{value}<extra></extra>',
+            showlegend: true
+        }],
+        layout: {
+            title: { text: `Distribution of ${chart.field}` },
+            legend: { orientation: 'h', y: -0.1 },
+            margin: CHART_MARGIN,
+            font: { size: 12 }
+        }
+    }),
+    'bar_chart@1': chart => ({
+        data: [{
+            type: 'bar',
+            orientation: 'h',
+            x: chart.counts,
+            y: chart.labels,
+            marker: { color: '#636efa' },
+            hovertemplate: `Count=%{x}<br>${chart.field}=%{y}<extra></extra>`,
+            showlegend: false
+        }],
+        layout: {
+            title: { text: `Distribution of ${chart.field}` },
+            xaxis: { title: { text: 'Count' } },
+            yaxis: { title: { text: chart.field } },
+            margin: CHART_MARGIN,
+            font: { size: 12 }
+        }
+    }),
+    'treemap@1': chart => {
+        // Colors follow the sorted labels, as plotly express assigns them
+        const colorIndex = new Map([...chart.labels].sort().map((label, index) => [label, index]));
+        return {
+            data: [{
+                type: 'treemap',
+                ids: chart.labels,
+                labels: chart.labels,
+                parents: chart.labels.map(() => ''),
+                values: chart.counts,
+                branchvalues: 'total',
+                customdata: chart.counts.map((count, index) => [count, chart.percentages[index]]),
+                marker: { colors: chart.labels.map(label => TREEMAP_COLORS[colorIndex.get(label) % TREEMAP_COLORS.length]) },
+                textinfo: 'label+value',
+                hovertemplate: '<b>%{label}</b><br>Count: %{value}<br>Percentage: %{customdata[1]:.2f}%'
+            }],
+            layout: {
+                title: { text: `Treemap of ${chart.field}` },
+                margin: CHART_MARGIN,
+                font: { size: 12 }
+            }
+        };
+    }
+};
+
+/**
+ * Build a full plotly figure from a compact chart payload
+ */
+function buildCompactFigure(chart) {
+    const spec = compactChartSpecs[chart.spec];
+    if (!spec) {
+        return Promise.reject(new Error(`Unsupported chart spec: ${chart.spec}`));
+    }
+    return getChartTemplate().then(template => {
+        const figure = spec(chart);
+        figure.layout.template = template;
+        return figure;
+    });
+}
+
 /**
  * Initialize the analysis page UI and event handlers
  */
@@ -23,6 +180,7 @@ function initializeAnalysisPage() {
     // Add event listeners to form elements
     document.getElementById('resetBtn').addEventListener('click', resetAnalysis);
     document.getElementById('analysisField').addEventListener('change', handleFieldSelection);
+    document.getElementById('secondaryField').addEventListener('change', handleSecondaryFieldSelection);
     document.getElementById('generateBtn').addEventListener('click', generateVisualizations);
     
     // Add event listeners to visualization checkboxes
@@ -66,12 +224,37 @@ function handleFieldSelection() {
     showVisualizationRecommendations(fieldType);
 }
 
+/**
+ * Handle comparison field selection change
+ */
+function handleSecondaryFieldSelection() {
+    const secondaryField = document.getElementById('secondaryField').value;
+    
+    appState.secondaryField = secondaryField || null;
+    
+    // Cross-tab visualizations are only available when a comparison field is selected
+    document.querySelectorAll('input.crosstab-check').forEach(cb => {
+        cb.disabled = !secondaryField;
+        if (!secondaryField) {
+            cb.checked = false;
+        }
+        cb.parentElement.classList.toggle('text-muted', !secondaryField);
+    });
+    
+    // Default to a heatmap when a comparison is first picked
+    if (secondaryField && !document.querySelector('input.crosstab-check:checked')) {
+        document.getElementById('heatmapCheck').checked = true;
+    }
+    
+    updateGenerateButtonState();
+}
+
 /**
  * Show visualization recommendations based on field type
  */
 function showVisualizationRecommendations(fieldType) {
-    // Enable all checkboxes by default
-    document.querySelectorAll('input[type="checkbox"]').forEach(cb => {
+    // Enable all single-field checkboxes by default
+    document.querySelectorAll('input[type="checkbox"]:not(.crosstab-check)').forEach(cb => {
         cb.disabled = false;
         cb.parentElement.classList.remove('text-muted');
     });
@@ -85,8 +268,8 @@ function showVisualizationRecommendations(fieldType) {
         document.getElementById('freqTableCheck').checked = true;
         document.getElementById('pieChartCheck').checked = true;
     } else if (fieldType === 'datetime') {
-        // Datetime fields work best with bar charts
-        document.getElementById('barChartCheck').checked = true;
+        // Datetime fields work best as a resampled time series
+        document.getElementById('timeSeriesCheck').checked = true;
         
         // Disable inappropriate visualizations for datetime
         document.getElementById('pieChartCheck').disabled = true;
@@ -95,6 +278,13 @@ function showVisualizationRecommendations(fieldType) {
         document.getElementById('treemapCheck').parentElement.classList.add('text-muted');
     }
     
+    // Numbers are never parsed as dates, so time series only applies to other field types
+    if (fieldType === 'numeric') {
+        document.getElementById('timeSeriesCheck').checked = false;
+        document.getElementById('timeSeriesCheck').disabled = true;
+        document.getElementById('timeSeriesCheck').parentElement.classList.add('text-muted');
+    }
+    
     // Update generate button state
     updateGenerateButtonState();
 }
@@ -110,6 +300,10 @@ function updateGenerateButtonState() {
     // Update selected visualizations array
     appState.selectedVisualizations = Array.from(checkboxes).map(cb => cb.value);
     
+    // Only show the interval picker when a time series is requested
+    document.getElementById('timeSeriesOptions').style.display =
+        appState.selectedVisualizations.includes('time_series') ? 'block' : 'none';
+    
     // Enable button only if a field is selected and at least one visualization type
     generateBtn.disabled = !(field && checkboxes.length > 0);
 }
@@ -127,27 +321,14 @@ function generateVisualizations() {
     // Prepare request data
     const requestData = {
         field: appState.selectedField,
-        visualization_types: appState.selectedVisualizations
+        secondary_field: appState.secondaryField,
+        interval: document.getElementById('timeSeriesInterval').value || null,
+        visualization_types: appState.selectedVisualizations,
+        compact: true
     };
     
-    // Send AJAX request
-    fetch('/analyze', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(requestData)
-    })
-    .then(response => {
-        if (!response.ok) {
-            return response.json().then(data => {
-                throw new Error(data.error || 'Network response was not ok');
-            }).catch(err => {
-                throw new Error('Network response was not ok: ' + err.message);
-            });
-        }
-        return response.json();
-    })
+    // Send AJAX request (served from the client cache when the server reports no change)
+    postJsonCached('/analyze', requestData)
     .then(data => {
         // Save generated visualizations
         appState.generatedVisualizations = data;
@@ -196,7 +377,7 @@ function displayVisualizations(visualizationsData) {
         const vizContainer = document.createElement('div');
         
         // Set column width based on visualization type
-        if (vizType === 'frequency_table') {
+        if (vizType === 'frequency_table' || vizType === 'heatmap' || vizType === 'time_series') {
             vizContainer.className = 'col-12 mb-4';
         } else {
             vizContainer.className = 'col-md-6 mb-4';
@@ -230,6 +411,22 @@ function displayVisualizations(visualizationsData) {
                 vizTitle = 'Treemap';
                 vizIcon = 'fa-th-large';
                 break;
+            case 'time_series':
+                vizTitle = 'Time Series';
+                vizIcon = 'fa-chart-line';
+                break;
+            case 'heatmap':
+                vizTitle = 'Heatmap';
+                vizIcon = 'fa-border-all';
+                break;
+            case 'stacked_bar':
+                vizTitle = 'Stacked Bar';
+                vizIcon = 'fa-layer-group';
+                break;
+            case 'grouped_bar':
+                vizTitle = 'Grouped Bar';
+                vizIcon = 'fa-chart-column';
+                break;
         }
         
         cardHeader.innerHTML = `
@@ -300,7 +497,7 @@ function displayVisualizations(visualizationsData) {
                     ${vizData.error}
                 `;
                 cardBody.appendChild(errorDiv);
-            } else if (vizData.data && vizData.data.data) {
+            } else if (vizData.format === 'compact' || (vizData.data && vizData.data.data)) {
                 // For charts, create a div for plotly
                 const plotDiv = document.createElement('div');
                 plotDiv.className = 'plot-container';
@@ -309,11 +506,16 @@ function displayVisualizations(visualizationsData) {
                 
                 cardBody.appendChild(plotDiv);
                 
+                // Compact charts are expanded into a full figure on the client
+                const figure = vizData.format === 'compact'
+                    ? buildCompactFigure(vizData)
+                    : Promise.resolve(vizData.data);
+                
                 // Defer the plot creation until after the container is added to the DOM
                 setTimeout(() => {
-                    try {
-                        Plotly.newPlot(plotDiv.id, vizData.data.data, vizData.data.layout || {});
-                    } catch (e) {
+                    figure
+                    .then(fig => Plotly.newPlot(plotDiv.id, fig.data, fig.layout || {}))
+                    .catch(e => {
                         console.error(`Error plotting ${vizType}:`, e);
                         plotDiv.innerHTML = `
                             <div class="alert alert-danger">
@@ -321,7 +523,7 @@ function displayVisualizations(visualizationsData) {
                                 Error displaying visualization
                             </div>
                         `;
-                    }
+                    });
                 }, 0);
             } else {
                 // No data available
@@ -78,6 +78,7 @@ function handleFilterFieldSelection() {
     
     if (fieldType === 'numeric') {
         numericFilterOptions.style.display = 'block';
+        showRangeHint(filterField.options[filterField.selectedIndex]);
     } else if (fieldType === 'text') {
         textFilterOptions.style.display = 'block';
     } else if (fieldType === 'categorical' || fieldType === 'datetime') {
@@ -85,6 +86,27 @@ function handleFilterFieldSelection() {
     }
 }
 
+/**
+ * Show the column's value range (from the ingest statistics) as input hints
+ */
+function showRangeHint(option) {
+    const minInput = document.getElementById('minValue');
+    const maxInput = document.getElementById('maxValue');
+    const rangeHint = document.getElementById('rangeHint');
+    const { min, max } = option.dataset;
+    
+    if (min === undefined || max === undefined) {
+        minInput.placeholder = '';
+        maxInput.placeholder = '';
+        rangeHint.textContent = '';
+        return;
+    }
+    
+    minInput.placeholder = min;
+    maxInput.placeholder = max;
+    rangeHint.textContent = `Values range from ${min} to ${max}`;
+}
+
 /**
  * Validate filter inputs in real-time
  */
@@ -207,24 +229,8 @@ function submitFilters() {
     document.getElementById('applyFilterBtn').disabled = true;
     document.getElementById('applyFilterBtn').innerHTML = '<i class="fas fa-spinner fa-spin me-1"></i> Applying...';
     
-    // Send request to server
-    fetch('/filter', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ filters })
-    })
-    .then(response => {
-        if (!response.ok) {
-            return response.json().then(data => {
-                throw new Error(data.error || 'Error applying filters');
-            }).catch(err => {
-                throw new Error('Error applying filters: ' + err.message);
-            });
-        }
-        return response.json();
-    })
+    // Send request to server (served from the client cache when the server reports no change)
+    postJsonCached('/filter', { filters })
     .then(data => {
         // Update the UI with filtered data
         updateDataPreview(data.preview_data);
@@ -0,0 +1,303 @@
+import os
+import logging
+import pandas as pd
+import numpy as np
+from utils.excel_processor import load_dataframe, release_dataframe, check_schema_compatible, cache_get, cache_put
+from utils.http_cache import compute_file_hash
+from utils.result_store import is_active, get_or_compute, save_result
+
+logger = logging.getLogger(__name__)
+
+# Column statistics keyed by (path, modification time); they are persisted in
+# the result store, keyed by content hash, so every worker process can reuse them
+_stats_cache = {}
+_STATS_CACHE_SIZE = 32
+
+# Number of most frequent values kept per column
+TOP_VALUES = 10
+
+# Quantiles reported for numeric columns
+QUANTILES = (0.25, 0.5, 0.75)
+
+# Numeric columns also keep every percentile so that quantiles can be merged
+# when rows are appended
+SKETCH_QUANTILES = np.arange(101) / 100
+
+# Size of the k-minimum-values sketch used to estimate distinct counts;
+# counts up to this size are exact
+DISTINCT_SKETCH_SIZE = 1024
+
+def _to_native(value):
+    """Convert numpy/pandas scalars into JSON-serializable Python values."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def _distinct_sketch(values):
+    """
+    Build a k-minimum-values sketch of the distinct values of a column.
+    
+    Args:
+        values (pandas.Index): Distinct non-null values of the column
+    
+    Returns:
+        list: Up to DISTINCT_SKETCH_SIZE smallest 64-bit value hashes, sorted
+    """
+    hashes = pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy()
+    if len(hashes) > DISTINCT_SKETCH_SIZE:
+        hashes = np.partition(hashes, DISTINCT_SKETCH_SIZE - 1)[:DISTINCT_SKETCH_SIZE]
+    return np.sort(hashes).tolist()
+
+def estimate_distinct(sketch):
+    """
+    Estimate the number of distinct values from a k-minimum-values sketch.
+    
+    Args:
+        sketch (list): Sorted smallest value hashes, as built by _distinct_sketch
+    
+    Returns:
+        int: Exact count when the sketch is not full, otherwise an estimate
+    """
+    if len(sketch) < DISTINCT_SKETCH_SIZE:
+        return len(sketch)
+    return int((DISTINCT_SKETCH_SIZE - 1) / (sketch[-1] / 2.0 ** 64))
+
+def _quantiles_from_sketch(sketch):
+    """Read the reported quantiles off a percentile sketch."""
+    return {str(q): sketch[int(round(q * 100))] for q in QUANTILES}
+
+def _merge_quantile_sketches(sketch, count, other_sketch, other_count):
+    """
+    Merge two percentile sketches into an approximate sketch of the combined data.
+    
+    Each percentile point stands for an equal share of its part's rows; the
+    merged percentiles are read off the combined weighted points.
+    """
+    if not other_count or other_sketch is None or other_sketch[0] is None:
+        return sketch
+    if not count or sketch[0] is None:
+        return other_sketch
+    
+    values = np.concatenate([sketch, other_sketch]).astype(float)
+    weights = np.concatenate([
+        np.full(len(sketch), count / len(sketch)),
+        np.full(len(other_sketch), other_count / len(other_sketch))
+    ])
+    order = np.argsort(values, kind='stable')
+    values, cumulative = values[order], np.cumsum(weights[order])
+    
+    positions = np.searchsorted(cumulative, SKETCH_QUANTILES * cumulative[-1], side='left')
+    merged = values[np.minimum(positions, len(values) - 1)]
+    
+    # The extremes are known exactly
+    merged[0] = min(sketch[0], other_sketch[0])
+    merged[-1] = max(sketch[-1], other_sketch[-1])
+    return merged.tolist()
+
+def _merge_bound(a, b, pick):
+    values = [value for value in (a, b) if value is not None]
+    return pick(values) if values else None
+
+def merge_column_stats(stats, other):
+    """
+    Combine the statistics of two datasets with the same columns.
+    
+    Counts, null counts, min/max, mean and standard deviation are merged
+    exactly; distinct counts and quantiles are merged through their sketches;
+    top values are merged from each part's top list, so they are exact only
+    while the most frequent values appear in both lists.
+    
+    Args:
+        stats (dict): Statistics of the existing dataset
+        other (dict): Statistics of the appended rows
+    
+    Returns:
+        dict: Statistics of the combined dataset
+    """
+    merged = {}
+    for column, left in stats.items():
+        right = other[column]
+        
+        sketch = np.union1d(
+            np.array(left['distinct_sketch'], dtype=np.uint64),
+            np.array(right['distinct_sketch'], dtype=np.uint64)
+        )[:DISTINCT_SKETCH_SIZE]
+        
+        top_counts = {}
+        for item in left['top_values'] + right['top_values']:
+            top_counts[item['value']] = top_counts.get(item['value'], 0) + item['count']
+        top_values = sorted(top_counts.items(), key=lambda item: item[1], reverse=True)[:TOP_VALUES]
+        
+        column_stats = {
+            'count': left['count'] + right['count'],
+            'null_count': left['null_count'] + right['null_count'],
+            'distinct_sketch': sketch.tolist(),
+            'distinct_count': estimate_distinct(sketch.tolist()),
+            'top_values': [{'value': value, 'count': count} for value, count in top_values]
+        }
+        
+        if 'min' in left:
+            column_stats['min'] = _merge_bound(left['min'], right.get('min'), min)
+            column_stats['max'] = _merge_bound(left['max'], right.get('max'), max)
+        
+        # Columns that are entirely empty in the appended rows may have been
+        # parsed as text there and carry no numeric statistics
+        if 'mean' in left:
+            n_left, n_right = left['count'], right['count']
+            total = n_left + n_right
+            if not n_right or right.get('mean') is None:
+                column_stats.update({'mean': left['mean'], 'std': left['std']})
+            elif not n_left or left['mean'] is None:
+                column_stats.update({'mean': right['mean'], 'std': right['std']})
+            else:
+                # Parallel variance (Chan et al.) from the sample std of each part
+                delta = right['mean'] - left['mean']
+                m2 = ((left['std'] or 0) ** 2 * (n_left - 1)
+                      + (right['std'] or 0) ** 2 * (n_right - 1)
+                      + delta ** 2 * n_left * n_right / total)
+                column_stats['mean'] = left['mean'] + delta * n_right / total
+                column_stats['std'] = (m2 / (total - 1)) ** 0.5 if total > 1 else None
+            
+            column_stats['quantile_sketch'] = _merge_quantile_sketches(
+                left['quantile_sketch'], n_left, right.get('quantile_sketch'), n_right
+            )
+            column_stats['quantiles'] = _quantiles_from_sketch(column_stats['quantile_sketch'])
+        
+        merged[column] = column_stats
+    
+    return merged
+
+def compute_column_stats(df):
+    """
+    Compute per-column statistics for a dataset.
+    
+    Numeric aggregates (min, max, mean, std, quantiles) are computed for all
+    numeric columns at once; a single value_counts per column then provides the
+    top values and the distinct-count sketch.
+    
+    Args:
+        df (pandas.DataFrame): Dataset to describe
+    
+    Returns:
+        dict: Mapping of column name to its statistics
+    """
+    stats = {}
+    
+    counts = df.count()
+    numeric = df.select_dtypes(include='number')
+    # Aggregates of a view without rows are missing (None), not skipped
+    if len(numeric.columns):
+        numeric_summary = {
+            'min': numeric.min(),
+            'max': numeric.max(),
+            'mean': numeric.mean(),
+            'std': numeric.std()
+        }
+        numeric_sketch = numeric.quantile(SKETCH_QUANTILES)
+    
+    for column in df.columns:
+        series = df[column]
+        value_counts = series.value_counts()
+        
+        column_stats = {
+            'count': int(counts[column]),
+            'null_count': int(len(series) - counts[column]),
+            'distinct_sketch': _distinct_sketch(value_counts.index),
+            'top_values': [
+                {'value': _to_native(value), 'count': int(count)}
+                for value, count in value_counts.head(TOP_VALUES).items()
+            ]
+        }
+        column_stats['distinct_count'] = estimate_distinct(column_stats['distinct_sketch'])
+        
+        if column in numeric.columns:
+            for name, values in numeric_summary.items():
+                column_stats[name] = _to_native(values[column])
+            column_stats['quantile_sketch'] = [_to_native(value) for value in numeric_sketch[column]]
+            column_stats['quantiles'] = _quantiles_from_sketch(column_stats['quantile_sketch'])
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            column_stats['min'] = _to_native(series.min())
+            column_stats['max'] = _to_native(series.max())
+        
+        stats[column] = column_stats
+    
+    return stats
+
+def store_column_stats(file_path, stats, dataset_hash=None):
+    """
+    Record statistics derived for a dataset (e.g. by append_column_stats), so
+    get_column_stats does not recompute them.
+    
+    Args:
+        file_path (str): Path to the dataset
+        stats (dict): Statistics of the dataset's contents
+        dataset_hash (str, optional): Content hash of the dataset; without it
+            the statistics are only cached in this process
+    """
+    cache_put(_stats_cache, (file_path, os.path.getmtime(file_path)), stats, _STATS_CACHE_SIZE)
+    save_result('column_stats', dataset_hash, stats)
+
+def append_column_stats(file_path, new_file_path, dataset_hash=None):
+    """
+    Derive the statistics of an appended dataset from the current catalog and
+    the new rows, without rescanning the existing data.
+    
+    Run this before append_to_dataset, so an append whose rows are rejected
+    leaves the current dataset as it was; record the result for the combined
+    dataset with store_column_stats.
+    
+    Args:
+        file_path (str): Path of the dataset before the append
+        new_file_path (str): Path of the data file holding the appended rows
+        dataset_hash (str, optional): Content hash of the dataset before the append
+    
+    Returns:
+        dict: Statistics of the combined dataset
+    """
+    try:
+        new_df = load_dataframe(new_file_path)
+        check_schema_compatible(load_dataframe(file_path), new_df)
+        return merge_column_stats(get_column_stats(file_path, dataset_hash), compute_column_stats(new_df))
+    
+    except Exception as e:
+        # Rejected rows are not kept in memory
+        release_dataframe(new_file_path)
+        logger.error(f"Error updating column statistics: {str(e)}")
+        raise Exception(f"Error updating column statistics: {str(e)}")
+
+def get_column_stats(file_path, dataset_hash=None):
+    """
+    Get the statistics catalog for a dataset, computing it on first use.
+    
+    The catalog is computed once at ingest and kept in the result store, so
+    later callers (exports, filter hints, chart builders) never rescan the data.
+    
+    Args:
+        file_path (str): Path to the Excel or CSV file
+        dataset_hash (str, optional): Content hash of the dataset; the file is
+            hashed when it is needed and not given
+    
+    Returns:
+        dict: Mapping of column name to its statistics
+    """
+    try:
+        mtime = os.path.getmtime(file_path)
+        key = (file_path, mtime)
+        stats = cache_get(_stats_cache, key)
+        if stats is not None:
+            return stats
+        
+        if dataset_hash is None and is_active():
+            dataset_hash = compute_file_hash(file_path)
+        stats = get_or_compute('column_stats', dataset_hash, [], lambda: compute_column_stats(load_dataframe(file_path)))
+        
+        cache_put(_stats_cache, key, stats, _STATS_CACHE_SIZE)
+        return stats
+    
+    except Exception as e:
+        logger.error(f"Error computing column statistics: {str(e)}")
+        raise Exception(f"Error computing column statistics: {str(e)}")
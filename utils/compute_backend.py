@@ -0,0 +1,502 @@
+import os
+import json
+import time
+import uuid
+import pickle
+import hashlib
+import logging
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, resource_tracker
+import pandas as pd
+import numpy as np
+from utils.excel_processor import load_dataframe, build_filter_mask, crosstab_counts, filters_cache_key, select_rows, cache_get, cache_put
+
+logger = logging.getLogger(__name__)
+
+# Only the computations in this module read the shared copy of a dataset. The
+# web workers still parse a dataset into their own memory (load_dataframe)
+# while ingesting it and for time series, exports and downloads, so each worker
+# serving those holds a private copy next to the shared one. Publishing alone
+# does not keep one.
+
+# Manifests describing the layout of each shared dataset; any process on the
+# host can attach to a dataset from its manifest
+MANIFEST_DIR = os.path.join(tempfile.gettempdir(), 'data_insight_shm')
+
+# Seconds to wait for another process that is publishing the same dataset
+PUBLISH_TIMEOUT = 60
+
+# Shared datasets whose publishing process has exited are removed by
+# sweep_datasets after this many seconds without use
+OWNER_GRACE = 300
+
+# Minimum seconds between two sweeps of the same process
+SWEEP_INTERVAL = 60
+
+# Where the shared memory blocks themselves are visible (Linux only)
+_SHM_DIR = '/dev/shm'
+
+# Column data offsets are aligned to this many bytes
+_ALIGNMENT = 64
+
+_settings = {'enabled': False, 'processes': None, 'dataset_ttl': 1800, 'web_workers': 1}
+_last_sweep = {'time': None}
+
+# Process pool of the current web worker, created on first use
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+# Datasets attached by this process: name -> (SharedMemory, DataFrame, manifest id)
+_attached = {}
+
+# Filtered views of attached datasets: (name, filters) -> positions of the matching rows
+_views = {}
+_VIEW_CACHE_SIZE = 16
+
+def configure(enabled, processes=None, dataset_ttl=1800):
+    """
+    Enable or disable the process-pool compute backend.
+    
+    When enabled, filtering, value counts and cross-tabs run in a pool of
+    processes that attach to the datasets in shared memory instead of in the
+    web worker, so heavy requests no longer hold the worker's GIL.
+    
+    Args:
+        enabled (bool): Whether to use the process pool
+        processes (int, optional): Pool size of each web worker; by default the
+            CPU count divided by the number of web workers (see set_web_workers)
+        dataset_ttl (int): Seconds an unused shared dataset is kept (see sweep_datasets)
+    """
+    _settings['enabled'] = enabled
+    _settings['processes'] = processes
+    _settings['dataset_ttl'] = dataset_ttl
+
+def set_web_workers(count):
+    """
+    Record how many web worker processes share the host.
+    
+    Every web worker has its own process pool; without an explicit pool size
+    the CPUs are divided between the workers' pools.
+    
+    Args:
+        count (int): Number of web worker processes
+    """
+    _settings['web_workers'] = max(1, count)
+
+def pool_size():
+    """Number of processes in the pool of each web worker."""
+    return _settings['processes'] or max(1, (os.cpu_count() or 1) // _settings['web_workers'])
+
+def is_enabled():
+    """Return True when computations should run in the process pool."""
+    return _settings['enabled']
+
+def _dataset_name(file_path):
+    """Name of the shared memory block holding a version of a dataset."""
+    key = f"{os.path.abspath(file_path)}:{os.path.getmtime(file_path)}"
+    return 'di_' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]
+
+def _manifest_path(name):
+    return os.path.join(MANIFEST_DIR, f"{name}.json")
+
+def _untrack(shm):
+    """
+    Stop the resource tracker from unlinking a block when this process exits.
+    
+    Shared datasets outlive the process that created or attached them; they are
+    removed explicitly by release_dataset, or by sweep_datasets once unused.
+    """
+    try:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+
+def _categorical_dtype(categories):
+    return pd.CategoricalDtype(pd.Index(categories, dtype=object))
+
+def _encode_column(series):
+    """
+    Convert a column into arrays that can be placed in shared memory.
+    
+    Numeric, boolean and naive datetime columns are stored as they are; all
+    other columns are stored as category codes plus their categories.
+    
+    Returns:
+        tuple: (kind, array, categories) where categories is None for plain arrays
+    """
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biufM':
+        return 'array', series.to_numpy(), None
+    
+    codes, uniques = pd.factorize(series, sort=False)
+    # Store the codes in the integer width pandas picks for this many categories
+    # so attaching does not have to convert (and copy) them
+    categorical = pd.Categorical.from_codes(codes, dtype=_categorical_dtype(uniques), validate=False)
+    return 'categorical', categorical.codes, list(uniques)
+
+def publish_dataset(file_path):
+    """
+    Place a dataset in shared memory, once per dataset version.
+    
+    The dataset is parsed by the first process that needs it and copied into a
+    single shared memory block; every other process attaches to that block.
+    
+    Args:
+        file_path (str): Path to the dataset
+    
+    Returns:
+        str: Name of the shared dataset
+    """
+    name = _dataset_name(file_path)
+    manifest_path = _manifest_path(name)
+    if os.path.exists(manifest_path):
+        return name
+    
+    sweep_datasets()
+    # The pool reads the shared copy; publishing keeps no private one in this process
+    df = load_dataframe(file_path, cache=False)
+    columns = []
+    payloads = []
+    size = 0
+    for column in df.columns:
+        kind, array, categories = _encode_column(df[column])
+        category_bytes = pickle.dumps(categories) if categories is not None else b''
+        
+        entry = {'name': column, 'kind': kind, 'dtype': array.dtype.str}
+        entry['offset'] = size
+        size += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+        entry['categories_offset'] = size
+        entry['categories_size'] = len(category_bytes)
+        size += -(-len(category_bytes) // _ALIGNMENT) * _ALIGNMENT
+        
+        columns.append(entry)
+        payloads.append((array, category_bytes))
+    
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    try:
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+    except FileExistsError:
+        # Another process is publishing the same dataset
+        deadline = time.monotonic() + PUBLISH_TIMEOUT
+        while not os.path.exists(manifest_path):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for shared dataset {name}")
+            time.sleep(0.05)
+        return name
+    
+    _untrack(shm)
+    try:
+        for entry, (array, category_bytes) in zip(columns, payloads):
+            target = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf, offset=entry['offset'])
+            target[:] = array
+            start = entry['categories_offset']
+            shm.buf[start:start + len(category_bytes)] = category_bytes
+        
+        # The id tells attached processes apart from a later publish under the same name
+        manifest = {'id': uuid.uuid4().hex, 'rows': len(df), 'size': size, 'owner': os.getpid(), 'columns': columns}
+        temporary_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'w') as f:
+            json.dump(manifest, f)
+        # Publishing the manifest makes the dataset visible to other processes
+        os.replace(temporary_path, manifest_path)
+    finally:
+        shm.close()
+    
+    logger.debug(f"Published {file_path} to shared memory as {name} ({size} bytes)")
+    return name
+
+def _read_manifest(name):
+    with open(_manifest_path(name)) as f:
+        return json.load(f)
+
+def _detach_released():
+    """
+    Drop attached datasets whose manifest has been removed (by release_dataset
+    or sweep_datasets) or replaced by a new publish of the same name.
+    """
+    for name, (_, _, manifest_id) in list(_attached.items()):
+        try:
+            current = _read_manifest(name).get('id')
+        except (OSError, ValueError):
+            current = None
+        if current != manifest_id:
+            _attached.pop(name)
+
+def attach_dataset(name):
+    """
+    Attach to a shared dataset without copying its column data.
+    
+    Plain columns are numpy views of the shared block and text columns are
+    categoricals over the shared codes. Attached datasets are kept until their
+    manifest is removed or replaced.
+    
+    Args:
+        name (str): Name returned by publish_dataset
+    
+    Returns:
+        pandas.DataFrame: Read-only view of the dataset
+    """
+    manifest = _read_manifest(name)
+    attached = _attached.get(name)
+    if attached is not None and attached[2] == manifest.get('id'):
+        return attached[1]
+    
+    # The mapping of a replaced dataset is freed once its DataFrame is garbage collected
+    _attached.pop(name, None)
+    _detach_released()
+    
+    shm = shared_memory.SharedMemory(name=name)
+    _untrack(shm)
+    
+    data = {}
+    for entry in manifest['columns']:
+        array = np.ndarray((manifest['rows'],), dtype=np.dtype(entry['dtype']), buffer=shm.buf, offset=entry['offset'])
+        array.flags.writeable = False
+        if entry['kind'] == 'categorical':
+            start = entry['categories_offset']
+            categories = pickle.loads(bytes(shm.buf[start:start + entry['categories_size']]))
+            array = pd.Categorical.from_codes(array, dtype=_categorical_dtype(categories), validate=False)
+        data[entry['name']] = array
+    
+    df = pd.DataFrame(data, copy=False)
+    _attached[name] = (shm, df, manifest.get('id'))
+    return df
+
+def _unlink_block(name):
+    """Unlink a shared memory block if it still exists."""
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    # Attaching registered the block with the resource tracker again; unlink
+    # unregisters it
+    shm.close()
+    shm.unlink()
+
+def _remove_dataset(name):
+    """Remove the manifest and the memory block of a shared dataset."""
+    try:
+        os.remove(_manifest_path(name))
+    except FileNotFoundError:
+        pass
+    _unlink_block(name)
+
+def _process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def sweep_datasets(force=False):
+    """
+    Remove shared datasets that are no longer used.
+    
+    Every task run on a dataset renews its lease by touching the manifest. A
+    dataset is removed when its lease is older than the configured TTL, or
+    older than OWNER_GRACE once the process that published it has exited (e.g.
+    after a restart). Memory blocks left without a manifest by a failed publish are
+    removed as well. Runs at most once per SWEEP_INTERVAL unless forced.
+    
+    Args:
+        force (bool): Sweep even if this process swept recently
+    
+    Returns:
+        int: Number of datasets removed
+    """
+    now = time.time()
+    if not force and _last_sweep['time'] is not None and now - _last_sweep['time'] < SWEEP_INTERVAL:
+        return 0
+    _last_sweep['time'] = now
+    
+    removed = 0
+    names = set()
+    try:
+        manifests = os.listdir(MANIFEST_DIR)
+    except FileNotFoundError:
+        manifests = []
+    
+    for filename in manifests:
+        if not filename.startswith('di_') or not filename.endswith('.json'):
+            continue
+        name = filename[:-len('.json')]
+        names.add(name)
+        manifest_path = _manifest_path(name)
+        try:
+            idle = now - os.path.getmtime(manifest_path)
+            with open(manifest_path) as f:
+                owner = json.load(f).get('owner')
+        except (OSError, ValueError):
+            continue
+        
+        owner_gone = owner is None or not _process_exists(owner)
+        if idle > _settings['dataset_ttl'] or (owner_gone and idle > OWNER_GRACE):
+            _attached.pop(name, None)
+            _remove_dataset(name)
+            removed += 1
+    
+    if os.path.isdir(_SHM_DIR):
+        for name in os.listdir(_SHM_DIR):
+            if not name.startswith('di_') or name in names:
+                continue
+            try:
+                orphaned = now - os.path.getmtime(os.path.join(_SHM_DIR, name)) > PUBLISH_TIMEOUT
+            except OSError:
+                continue
+            # A block without a manifest is still being published for up to PUBLISH_TIMEOUT
+            if orphaned and not os.path.exists(_manifest_path(name)):
+                _unlink_block(name)
+                removed += 1
+    
+    if removed:
+        logger.info(f"Removed {removed} unused shared datasets")
+    return removed
+
+def release_dataset(file_path):
+    """
+    Remove a dataset from shared memory.
+    
+    Processes that are still attached keep their mapping until they notice the
+    manifest is gone (see _detach_released); the dataset is published again if
+    it is needed later.
+    
+    Args:
+        file_path (str): Path to the dataset
+    """
+    try:
+        name = _dataset_name(file_path)
+    except OSError:
+        name = None
+    
+    if name is not None:
+        # The mapping is freed once the DataFrame viewing it is garbage collected
+        _attached.pop(name, None)
+        _remove_dataset(name)
+    sweep_datasets()
+
+def _get_executor():
+    """Return the process pool of the current process, creating it on first use."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        # A pool inherited through fork (e.g. from a preloading master) is unusable
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(
+                max_workers=pool_size(),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+def _ready():
+    return os.getpid()
+
+def start_pool():
+    """
+    Start the pool processes of the current process ahead of the first request.
+    
+    Spawned processes import pandas before they can run a task, which otherwise
+    delays the first computation by a few seconds. Also removes the shared
+    datasets left unused by earlier runs.
+    """
+    sweep_datasets(force=True)
+    executor = _get_executor()
+    for future in [executor.submit(_ready) for _ in range(executor._max_workers)]:
+        future.result()
+
+def _submit(task, file_path, *args):
+    """Publish a dataset if needed and run a task on it in the process pool."""
+    name = publish_dataset(file_path)
+    # Renew the dataset's lease so sweep_datasets keeps it
+    try:
+        os.utime(_manifest_path(name))
+    except OSError:
+        pass
+    return _get_executor().submit(task, name, *args).result()
+
+def _view_rows(name, df, filters):
+    """
+    Positions of the rows of an attached dataset matching a filter set,
+    evaluated once per pool process (see excel_processor.get_filtered_rows).
+    """
+    if not filters:
+        return None
+    key = (name, filters_cache_key(filters))
+    rows = cache_get(_views, key)
+    if rows is None:
+        rows = np.flatnonzero(build_filter_mask(df, filters))
+        cache_put(_views, key, rows, _VIEW_CACHE_SIZE)
+    return rows
+
+def _filter_preview_task(name, filters, preview_rows):
+    df = attach_dataset(name)
+    rows = _view_rows(name, df, filters)
+    if rows is None:
+        rows = np.arange(len(df))
+    preview = df.take(rows[:preview_rows]).astype(object)
+    preview_data = preview.replace({np.nan: None}).to_dict('records')
+    return preview_data, df.columns.tolist(), len(rows)
+
+def _value_counts_task(name, field, filters):
+    df = attach_dataset(name)
+    if field not in df.columns:
+        raise ValueError(f"Field '{field}' not found in the data")
+    counts = select_rows(df[field], _view_rows(name, df, filters)).value_counts()
+    # Categorical counts list every category, including unused ones
+    counts = counts[counts > 0]
+    return list(counts.index.astype(object)), counts.to_numpy(), counts.name
+
+def _crosstab_task(name, row_field, column_field, filters, top_k):
+    df = attach_dataset(name)
+    rows = _view_rows(name, df, filters)
+    columns = [field for field in dict.fromkeys((row_field, column_field)) if field in df.columns]
+    return crosstab_counts(select_rows(df[columns], rows), row_field, column_field, top_k)
+
+def filter_preview(file_path, filters=None, preview_rows=10):
+    """
+    Filter a dataset in the process pool and return a preview of the result.
+    
+    Args:
+        file_path (str): Path to the dataset
+        filters (dict, optional): Dictionary of filters to apply {column: value}
+        preview_rows (int): Number of rows to return for preview
+    
+    Returns:
+        tuple: (preview_data, columns, total_rows), as returned by process_excel
+    """
+    return _submit(_filter_preview_task, file_path, filters, preview_rows)
+
+def value_counts(file_path, field, filters=None):
+    """
+    Count the values of a field in the process pool.
+    
+    Args:
+        file_path (str): Path to the dataset
+        field (str): Field to count
+        filters (dict, optional): Dictionary of filters to apply {column: value}
+    
+    Returns:
+        pandas.Series: Counts indexed by value, most frequent first
+    """
+    values, counts, series_name = _submit(_value_counts_task, file_path, field, filters)
+    return pd.Series(counts, index=pd.Index(values, name=field), name=series_name)
+
+def crosstab(file_path, row_field, column_field, filters=None, top_k=20):
+    """
+    Count co-occurrences of two fields in the process pool.
+    
+    Args:
+        file_path (str): Path to the dataset
+        row_field (str): Field shown on the row axis
+        column_field (str): Field shown on the column axis
+        filters (dict, optional): Dictionary of filters to apply {column: value}
+        top_k (int): Maximum number of categories per axis, including 'Others'
+    
+    Returns:
+        tuple: (row_labels, column_labels, counts), as returned by crosstab_counts
+    """
+    return _submit(_crosstab_task, file_path, row_field, column_field, filters, top_k)
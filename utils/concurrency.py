@@ -0,0 +1,157 @@
+import math
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Number of recent request durations used to estimate Retry-After
+DURATION_SAMPLES = 50
+
+# In-flight computations of this process: key -> _Flight
+_flights = {}
+_flights_lock = threading.Lock()
+
+# Admission limits of the heavy routes: name -> _RouteLimit
+_route_limits = {}
+
+class _Flight:
+    """A computation shared by every caller that asks for the same key while it runs."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+def single_flight(key, compute):
+    """
+    Run a computation once for all concurrent callers with the same key.
+    
+    The first caller runs compute; callers arriving while it runs wait for it and
+    receive the same result, or the same exception. Nothing is cached once the
+    computation has finished. Only threads of the current process are coalesced.
+    
+    Args:
+        key (str): Identifies the computation, e.g. a make_result_key digest
+        compute (callable): Function producing the result
+    
+    Returns:
+        The result of compute; callers must not modify it
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    
+    if not leader:
+        logger.debug(f"Waiting for in-flight computation {key}")
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+    
+    try:
+        flight.result = compute()
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+class RouteSaturated(Exception):
+    """Raised when a route's active and queued requests are at their limits."""
+    
+    def __init__(self, name, retry_after):
+        super().__init__(f"Route {name} is saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class _RouteLimit:
+    """Concurrency limit of one route: active requests plus a bounded queue."""
+    
+    def __init__(self, max_active, max_queued, queue_timeout):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.slots = threading.BoundedSemaphore(max_active)
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.durations = deque(maxlen=DURATION_SAMPLES)
+    
+    def acquire(self):
+        """Take a slot, waiting in the queue if there is room; return False when rejected."""
+        if self.slots.acquire(blocking=False):
+            return True
+        with self.lock:
+            if self.queued >= self.max_queued:
+                return False
+            self.queued += 1
+        try:
+            return self.slots.acquire(timeout=self.queue_timeout)
+        finally:
+            with self.lock:
+                self.queued -= 1
+    
+    def release(self, duration):
+        with self.lock:
+            self.durations.append(duration)
+        self.slots.release()
+    
+    def retry_after(self):
+        """Estimate the seconds until the queue has drained from recent request durations."""
+        with self.lock:
+            if not self.durations:
+                return 1
+            average = sum(self.durations) / len(self.durations)
+            return max(1, math.ceil(average * (self.queued + 1) / self.max_active))
+
+def configure_route(name, max_active, max_queued, queue_timeout):
+    """
+    Set the admission limit of computations run with run_admitted.
+    
+    Args:
+        name (str): Route name used with run_admitted
+        max_active (int): Requests of this process computing at the same time
+        max_queued (int): Requests that may wait for a slot; more are rejected at once
+        queue_timeout (float): Seconds a queued request waits before it is rejected
+    """
+    _route_limits[name] = _RouteLimit(max_active, max_queued, queue_timeout)
+
+def run_admitted(name, compute):
+    """
+    Run a computation within a route's admission limit.
+    
+    The computation starts at once when the route has a free slot, otherwise it
+    waits in the route's queue. Requests beyond the queue, or that wait longer
+    than the queue timeout, are rejected. Routes without a configure_route call
+    are not limited. Wrap the computation in single_flight first so identical
+    requests share one slot.
+    
+    Args:
+        name (str): Route name passed to configure_route
+        compute (callable): Function producing the result
+    
+    Returns:
+        The result of compute
+    
+    Raises:
+        RouteSaturated: When the route has no room for the computation
+    """
+    limit = _route_limits.get(name)
+    if limit is None:
+        return compute()
+    
+    if not limit.acquire():
+        retry_after = limit.retry_after()
+        logger.warning(f"Rejecting {name} request, route is saturated (retry after {retry_after}s)")
+        raise RouteSaturated(name, retry_after)
+    
+    start = time.monotonic()
+    try:
+        return compute()
+    finally:
+        limit.release(time.monotonic() - start)
@@ -1,25 +1,443 @@
+import os
+import re
+import json
+import uuid
+import zipfile
+import threading
+import xml.etree.ElementTree as ET
 import pandas as pd
 import numpy as np
 import logging
 
 logger = logging.getLogger(__name__)
 
-def validate_excel_file(file_path):
+# Parsed data files, keyed by (path, modification time) so every helper in this
+# module shares a single parse of the uploaded file
+_dataframe_cache = {}
+_DATAFRAME_CACHE_SIZE = 8
+
+# Value counts per field keyed by (path, modification time, field, filters);
+# unfiltered counts are kept so that appending rows can update them from the
+# new rows alone
+_frequency_cache = {}
+_FREQUENCY_CACHE_SIZE = 128
+
+# Filtered views keyed by (path, modification time, filters): the positions of
+# the rows matching a filter set, shared by every computation over those rows
+_view_cache = {}
+_VIEW_CACHE_SIZE = 16
+
+# Cross-tab results keyed by (dataset, field pair, filters, top_k)
+_crosstab_cache = {}
+_CROSSTAB_CACHE_SIZE = 64
+
+# Resampled time series keyed by (dataset, field, interval, max_points, method, filters)
+_time_series_cache = {}
+_TIME_SERIES_CACHE_SIZE = 64
+
+# Resampling intervals offered for time series, finest first, with their
+# approximate length in seconds (used to pick an interval automatically)
+TIME_SERIES_INTERVALS = {
+    'min': 60,
+    'h': 3600,
+    'D': 86400,
+    'W': 7 * 86400,
+    'MS': 30 * 86400,
+    'QS': 91 * 86400,
+    'YS': 365 * 86400
+}
+
+# XML namespaces used by the workbook metadata parts of .xlsx files
+_SPREADSHEET_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_RELATIONSHIP_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_DIMENSION_RE = re.compile(r'<(?:\w+:)?dimension ref="([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?"')
+
+# Bounded caches (here and in column_stats and compute_backend) are shared by
+# every request thread of a worker; all reads and writes go through cache_get
+# and cache_put, which hold this lock
+_cache_lock = threading.Lock()
+
+def cache_get(cache, key):
+    """Look up a bounded cache entry and mark it as the most recently used."""
+    with _cache_lock:
+        value = cache.pop(key, None)
+        if value is not None:
+            cache[key] = value
+        return value
+
+def cache_put(cache, key, value, max_size):
+    """Insert a value into a bounded cache, evicting the least recently used entries when full."""
+    with _cache_lock:
+        cache.pop(key, None)
+        while cache and len(cache) >= max_size:
+            cache.pop(next(iter(cache)))
+        cache[key] = value
+
+def cache_pop(cache, key):
+    """Remove an entry from a bounded cache, if present."""
+    with _cache_lock:
+        return cache.pop(key, None)
+
+def load_dataframe(file_path, cache=True):
     """
-    Validate that the uploaded file is a valid Excel file with data.
+    Read a data file into a DataFrame, reusing the parsed copy while the file
+    is unchanged on disk.
     
     Args:
-        file_path (str): Path to the uploaded file
+        file_path (str): Path to the Excel or CSV file
+        cache (bool): Keep a new parse for later calls; an already cached
+            parse is reused either way
         
     Returns:
-        dict: Validation result with 'valid' and 'message' keys
+        pandas.DataFrame: Parsed file contents (shared, do not modify in place)
     """
-    try:
+    key = (file_path, os.path.getmtime(file_path))
+    df = cache_get(_dataframe_cache, key)
+    if df is None:
         # Determine file type and read accordingly
         if file_path.endswith('.csv'):
             df = pd.read_csv(file_path)
+        elif file_path.endswith('.pkl'):
+            # A single worksheet extracted by load_sheet
+            df = pd.read_pickle(file_path)
+        elif file_path.endswith('.dataset.json'):
+            # A dataset grown by append_to_dataset: concatenate its parts, which
+            # are not cached on their own so the rows are held only once
+            parts = []
+            for part in _dataset_parts(file_path):
+                parts.append(load_dataframe(part))
+                release_dataframe(part)
+            df = pd.concat([part[parts[0].columns] for part in parts], ignore_index=True)
         else:
             df = pd.read_excel(file_path)
+        if cache:
+            cache_put(_dataframe_cache, key, df, _DATAFRAME_CACHE_SIZE)
+    return df
+
+def release_dataframe(file_path):
+    """
+    Drop the cached parse of a data file, e.g. once its rows are part of an
+    appended dataset.
+    
+    Args:
+        file_path (str): Path to the Excel or CSV file
+    """
+    cache_pop(_dataframe_cache, (file_path, os.path.getmtime(file_path)))
+
+def _dataset_parts(file_path):
+    """List the data files making up a dataset (a single file unless rows were appended)."""
+    if file_path.endswith('.dataset.json'):
+        with open(file_path) as f:
+            return json.load(f)['parts']
+    return [file_path]
+
+def check_schema_compatible(df, new_df):
+    """
+    Check that new rows can be appended to a dataset.
+    
+    Column order may differ, but both frames must have the same columns and each
+    column must keep its kind (numeric, datetime or other). Columns that are
+    entirely empty in the new rows are accepted regardless of kind. There must
+    be at least one new row.
+    
+    Args:
+        df (pandas.DataFrame): Existing dataset
+        new_df (pandas.DataFrame): Rows to append
+        
+    Raises:
+        ValueError: Describing the first mismatch found
+    """
+    missing = [column for column in df.columns if column not in new_df.columns]
+    extra = [column for column in new_df.columns if column not in df.columns]
+    if missing or extra:
+        raise ValueError(f"Columns do not match the current dataset (missing: {missing}, unexpected: {extra})")
+    if new_df.empty:
+        raise ValueError("The new file has no rows to append")
+    
+    def kind(series):
+        if pd.api.types.is_numeric_dtype(series):
+            return 'numeric'
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return 'datetime'
+        return 'other'
+    
+    for column in df.columns:
+        if new_df[column].isna().all():
+            continue
+        if kind(df[column]) != kind(new_df[column]):
+            raise ValueError(
+                f"Column '{column}' is {kind(df[column])} in the current dataset but {kind(new_df[column])} in the new file"
+            )
+
+def append_to_dataset(file_path, new_file_path):
+    """
+    Append the rows of a new data file to a dataset.
+    
+    The combined dataset is recorded as a manifest listing its parts, so no
+    existing data is rewritten or parsed again. The parsed frame and any cached
+    frequency tables of the current dataset are carried over to the new one and
+    updated from the new rows only; the frames of both parts are dropped from
+    the cache so every row stays in memory once.
+    
+    Args:
+        file_path (str): Path of the current dataset
+        new_file_path (str): Path of the data file holding the rows to append
+        
+    Returns:
+        str: Path of the combined dataset
+    """
+    try:
+        df = load_dataframe(file_path)
+        new_df = load_dataframe(new_file_path)
+        check_schema_compatible(df, new_df)
+        new_df = new_df[df.columns]
+        
+        manifest_path = os.path.join(os.path.dirname(new_file_path), f"{uuid.uuid4()}.dataset.json")
+        with open(manifest_path, 'w') as f:
+            json.dump({'parts': _dataset_parts(file_path) + [new_file_path]}, f)
+        mtime = os.path.getmtime(manifest_path)
+        
+        # Reuse the already-parsed history instead of re-reading every part
+        cache_put(_dataframe_cache, (manifest_path, mtime),
+                  pd.concat([df, new_df], ignore_index=True), _DATAFRAME_CACHE_SIZE)
+        
+        # Merge cached frequency tables of the whole dataset with counts over the new rows
+        with _cache_lock:
+            cached_counts = list(_frequency_cache.items())
+        for (path, _, field, filters_key), counts in cached_counts:
+            if path == file_path and filters_key == filters_cache_key(None):
+                merged = counts.add(new_df[field].value_counts(), fill_value=0).astype('int64')
+                merged = merged.sort_values(ascending=False, kind='stable')
+                cache_put(_frequency_cache, (manifest_path, mtime, field, filters_key), merged, _FREQUENCY_CACHE_SIZE)
+        
+        # The combined frame holds all rows now
+        release_dataframe(file_path)
+        release_dataframe(new_file_path)
+        
+        return manifest_path
+    
+    except Exception as e:
+        logger.error(f"Error appending to dataset: {str(e)}")
+        raise Exception(f"Error appending to dataset: {str(e)}")
+
+def _column_number(letters):
+    """Convert a spreadsheet column reference such as 'AB' to its 1-based number."""
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord('A') + 1
+    return number
+
+def _xlsx_sheet_catalog(file_path):
+    """Read sheet names and dimensions from the metadata parts of an .xlsx file."""
+    sheets = []
+    with zipfile.ZipFile(file_path) as archive:
+        workbook = ET.fromstring(archive.read('xl/workbook.xml'))
+        relationships = ET.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+        targets = {rel.get('Id'): rel.get('Target') for rel in relationships}
+        
+        for sheet in workbook.iter(f'{{{_SPREADSHEET_NS}}}sheet'):
+            target = targets.get(sheet.get(f'{{{_RELATIONSHIP_NS}}}id'), '')
+            if 'worksheets/' not in target:
+                # Chart sheets hold no data
+                continue
+            part = target.lstrip('/') if target.startswith('/') else f'xl/{target}'
+            
+            # The <dimension> element sits at the top of the sheet part, so only
+            # its first few kilobytes need to be decompressed
+            rows = columns = None
+            with archive.open(part) as f:
+                match = _DIMENSION_RE.search(f.read(4096).decode('utf-8', 'ignore'))
+            if match:
+                first_column, first_row, last_column, last_row = match.groups()
+                last_column = last_column or first_column
+                last_row = last_row or first_row
+                # The first row holds the column headers
+                rows = max(int(last_row) - int(first_row), 0)
+                columns = _column_number(last_column) - _column_number(first_column) + 1
+            
+            sheets.append({'name': sheet.get('name'), 'rows': rows, 'columns': columns})
+    return sheets
+
+def get_sheet_catalog(file_path):
+    """
+    List the worksheets of a workbook without parsing any cells.
+    
+    Args:
+        file_path (str): Path to the Excel or CSV file
+        
+    Returns:
+        list: One dict per worksheet with 'name', 'rows' and 'columns' keys
+              (row and column counts are None when the workbook does not record
+              them); empty for CSV files
+    """
+    try:
+        if file_path.endswith('.csv'):
+            return []
+        
+        if file_path.endswith('.xlsx'):
+            try:
+                return _xlsx_sheet_catalog(file_path)
+            except (KeyError, zipfile.BadZipFile, ET.ParseError) as e:
+                logger.warning(f"Could not read workbook metadata, falling back to the Excel reader: {str(e)}")
+        
+        with pd.ExcelFile(file_path) as workbook:
+            return [{'name': name, 'rows': None, 'columns': None} for name in workbook.sheet_names]
+    
+    except Exception as e:
+        logger.error(f"Error reading sheet catalog: {str(e)}")
+        raise Exception(f"Error reading workbook sheets: {str(e)}")
+
+def load_sheet(file_path, sheet_name):
+    """
+    Parse a single worksheet and store it as its own dataset file.
+    
+    Only the requested sheet is parsed. The result is written next to the
+    workbook so that later requests, in any worker, load it without touching
+    the workbook again.
+    
+    Args:
+        file_path (str): Path to the Excel workbook
+        sheet_name (str): Name of the worksheet to load
+        
+    Returns:
+        str: Path of the dataset file holding the sheet, usable wherever a data
+             file path is expected
+    """
+    try:
+        sheet_names = [sheet['name'] for sheet in get_sheet_catalog(file_path)]
+        if sheet_name not in sheet_names:
+            raise ValueError(f"Sheet '{sheet_name}' not found in the workbook")
+        
+        sheet_path = f"{file_path}.sheet{sheet_names.index(sheet_name)}.pkl"
+        if not os.path.exists(sheet_path) or os.path.getmtime(sheet_path) < os.path.getmtime(file_path):
+            df = pd.read_excel(file_path, sheet_name=sheet_name)
+            df.to_pickle(sheet_path)
+        
+        return sheet_path
+    
+    except Exception as e:
+        logger.error(f"Error loading sheet: {str(e)}")
+        raise Exception(f"Error loading sheet '{sheet_name}': {str(e)}")
+
+def _string_match(values, predicate):
+    """
+    Evaluate a predicate over a column's values converted to strings.
+    
+    For categorical columns the predicate runs once per category and is then
+    broadcast through the category codes.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        category_matches = predicate(pd.Series(values.cat.categories.astype(str))).to_numpy(dtype=bool)
+        # Missing values compare as the string 'nan', like astype(str) does
+        missing_match = bool(predicate(pd.Series(['nan'])).iloc[0])
+        codes = values.cat.codes.to_numpy()
+        return np.where(codes >= 0, category_matches[np.maximum(codes, 0)], missing_match)
+    return predicate(values.astype(str)).to_numpy(dtype=bool)
+
+def build_filter_mask(df, filters):
+    """
+    Evaluate filters as a boolean row mask, without copying any data.
+    
+    Args:
+        df (pandas.DataFrame): Data to filter
+        filters (dict, optional): Dictionary of filters to apply {column: value}
+        
+    Returns:
+        numpy.ndarray: Boolean array, True for rows matching every filter
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if filters and isinstance(filters, dict):
+        for column, filter_value in filters.items():
+            if column in df.columns:
+                values = df[column]
+                if isinstance(filter_value, dict):
+                    # Handle range filters
+                    if 'min' in filter_value and pd.api.types.is_numeric_dtype(values):
+                        mask &= (values >= filter_value['min']).to_numpy()
+                    if 'max' in filter_value and pd.api.types.is_numeric_dtype(values):
+                        mask &= (values <= filter_value['max']).to_numpy()
+                    if 'contains' in filter_value:
+                        mask &= _string_match(
+                            values, lambda strings: strings.str.contains(filter_value['contains'], case=False, na=False)
+                        )
+                else:
+                    # Simple equality filter
+                    mask &= _string_match(values, lambda strings: strings == str(filter_value))
+    return mask
+
+def filters_cache_key(filters):
+    """Serialize a filter set into a cache key; no filters and empty filters are equal."""
+    return json.dumps(filters or {}, sort_keys=True, default=str)
+
+def get_filtered_rows(file_path, filters=None):
+    """
+    Get the filtered view of a dataset: the positions of the rows matching a
+    filter set.
+    
+    The view is materialized once per dataset version and filter set over the
+    cached DataFrame and shared by every computation on it (previews, charts,
+    cross-tabs, exports). Those then only touch the selected rows, so their
+    cost follows the size of the subset rather than of the file.
+    
+    Args:
+        file_path (str): Path to the Excel or CSV file
+        filters (dict, optional): Dictionary of filters to apply {column: value}
+        
+    Returns:
+        numpy.ndarray: Sorted positions of the matching rows (read-only), or
+              None when there are no filters and every row is selected
+    """
+    if not filters:
+        return None
+    
+    key = (file_path, os.path.getmtime(file_path), filters_cache_key(filters))
+    rows = cache_get(_view_cache, key)
+    if rows is None:
+        rows = np.flatnonzero(build_filter_mask(load_dataframe(file_path), filters))
+        rows.flags.writeable = False
+        cache_put(_view_cache, key, rows, _VIEW_CACHE_SIZE)
+    return rows
+
+def select_rows(data, rows):
+    """
+    Restrict a DataFrame or Series to the rows of a filtered view.
+    
+    Args:
+        data (pandas.DataFrame or pandas.Series): Data of the whole dataset
+        rows (numpy.ndarray): Row positions from get_filtered_rows, or None for all rows
+        
+    Returns:
+        pandas.DataFrame or pandas.Series: The selected rows
+    """
+    return data if rows is None else data.take(rows)
+
+def apply_filters(df, filters):
+    """
+    Apply filters to a DataFrame.
+    
+    Args:
+        df (pandas.DataFrame): Data to filter
+        filters (dict, optional): Dictionary of filters to apply {column: value}
+        
+    Returns:
+        pandas.DataFrame: Rows matching every filter
+    """
+    if not filters:
+        return df
+    return df[build_filter_mask(df, filters)]
+
+def validate_excel_file(file_path):
+    """
+    Validate that the uploaded file is a valid Excel file with data.
+    
+    Args:
+        file_path (str): Path to the uploaded file
+        
+    Returns:
+        dict: Validation result with 'valid' and 'message' keys
+    """
+    try:
+        df = load_dataframe(file_path)
         
         # Check if the file has data
         if df.empty:
@@ -55,65 +473,59 @@ def process_excel(file_path, preview_rows=10, filters=None):
               representing rows, and columns is a list of column names
     """
     try:
-        # Determine file type and read accordingly
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        else:
-            df = pd.read_excel(file_path)
+        # Hand the work to the process pool when that backend is enabled
+        from utils import compute_backend
+        if compute_backend.is_enabled():
+            return compute_backend.filter_preview(file_path, filters, preview_rows)
+        
+        df = load_dataframe(file_path)
         
         # Get columns
         columns = df.columns.tolist()
         
-        # Apply filters if provided
-        if filters and isinstance(filters, dict):
-            for column, filter_value in filters.items():
-                if column in df.columns:
-                    if isinstance(filter_value, dict):
-                        # Handle range filters
-                        if 'min' in filter_value and pd.api.types.is_numeric_dtype(df[column]):
-                            df = df[df[column] >= filter_value['min']]
-                        if 'max' in filter_value and pd.api.types.is_numeric_dtype(df[column]):
-                            df = df[df[column] <= filter_value['max']]
-                        if 'contains' in filter_value:
-                            df = df[df[column].astype(str).str.contains(filter_value['contains'], case=False, na=False)]
-                    else:
-                        # Simple equality filter
-                        df = df[df[column].astype(str) == str(filter_value)]
+        # Only the previewed rows of the filtered view are copied
+        rows = get_filtered_rows(file_path, filters)
+        total_rows = len(df) if rows is None else len(rows)
+        preview = df.head(preview_rows) if rows is None else df.take(rows[:preview_rows])
         
         # Convert to list of dictionaries for preview (limit rows)
-        preview_data = df.head(preview_rows).replace({np.nan: None}).to_dict('records')
+        preview_data = preview.replace({np.nan: None}).to_dict('records')
         
-        return preview_data, columns, len(df)
+        return preview_data, columns, total_rows
     
     except Exception as e:
         logger.error(f"Error processing Excel file: {str(e)}")
         raise Exception(f"Error processing Excel file: {str(e)}")
 
-def get_column_types(file_path):
+def get_column_types(file_path, column_stats=None):
     """
     Analyze column types to determine which fields are suitable for analysis.
     
     Args:
         file_path (str): Path to the Excel file
+        column_stats (dict, optional): Statistics catalog of the dataset; its
+            distinct counts are used instead of scanning the data
         
     Returns:
         dict: Dictionary mapping column names to their types
     """
     try:
-        # Determine file type and read accordingly
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        else:
-            df = pd.read_excel(file_path)
+        df = load_dataframe(file_path)
         
         column_types = {}
         
         for column in df.columns:
+            if column_stats and column in column_stats:
+                distinct_count = column_stats[column]['distinct_count']
+            else:
+                distinct_count = None
+            
             if pd.api.types.is_numeric_dtype(df[column]):
                 column_types[column] = 'numeric'
             elif pd.api.types.is_datetime64_any_dtype(df[column]):
                 column_types[column] = 'datetime'
-            elif pd.api.types.is_categorical_dtype(df[column]) or df[column].nunique() < 20:
+            elif pd.api.types.is_categorical_dtype(df[column]) or (
+                    distinct_count if distinct_count is not None else df[column].nunique()) < 20:
                 column_types[column] = 'categorical'
             else:
                 column_types[column] = 'text'
@@ -124,50 +536,57 @@ def get_column_types(file_path):
         logger.error(f"Error getting column types: {str(e)}")
         raise Exception(f"Error analyzing column types: {str(e)}")
 
-def get_field_data(file_path, field):
+def get_field_data(file_path, field, filters=None):
     """
     Extract data for a specific field from the Excel file.
     
     Args:
         file_path (str): Path to the Excel file
         field (str): Field/column name to extract
+        filters (dict, optional): Dictionary of filters to apply {column: value}
         
     Returns:
-        pandas.Series: Data for the specified field
+        pandas.Series: Data for the specified field, restricted to the filtered view
     """
     try:
-        # Determine file type and read accordingly
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        else:
-            df = pd.read_excel(file_path)
+        df = load_dataframe(file_path)
         
         if field not in df.columns:
             raise ValueError(f"Field '{field}' not found in the data")
         
-        return df[field]
+        return select_rows(df[field], get_filtered_rows(file_path, filters))
     
     except Exception as e:
         logger.error(f"Error getting field data: {str(e)}")
         raise Exception(f"Error extracting field data: {str(e)}")
 
-def get_frequency_table(file_path, field):
+def get_frequency_table(file_path, field, filters=None):
     """
     Generate a frequency table for a field.
     
     Args:
         file_path (str): Path to the Excel file
         field (str): Field to analyze
+        filters (dict, optional): Dictionary of filters to apply {column: value}
         
     Returns:
         dict: Dictionary with value counts and percentages
     """
     try:
-        # Get the field data
-        field_data = get_field_data(file_path, field)
+        cache_key = (file_path, os.path.getmtime(file_path), field, filters_cache_key(filters))
+        counts = cache_get(_frequency_cache, cache_key)
+        if counts is None:
+            from utils import compute_backend
+            if compute_backend.is_enabled():
+                counts = compute_backend.value_counts(file_path, field, filters)
+            else:
+                # Get the field data of the filtered view
+                field_data = get_field_data(file_path, field, filters)
+                counts = field_data.value_counts()
+            cache_put(_frequency_cache, cache_key, counts, _FREQUENCY_CACHE_SIZE)
         
         # Generate value counts
-        value_counts = field_data.value_counts().reset_index()
+        value_counts = counts.reset_index()
         value_counts.columns = ['value', 'count']
         
         # Calculate percentages
@@ -182,3 +601,299 @@ def get_frequency_table(file_path, field):
     except Exception as e:
         logger.error(f"Error generating frequency table: {str(e)}")
         raise Exception(f"Error generating frequency table: {str(e)}")
+
+def _top_k_codes(series, top_k):
+    """
+    Encode a column as integer category codes, keeping only the top_k most
+    frequent categories.
+    
+    Categories beyond the first top_k - 1 are folded into a trailing 'Others'
+    code. Missing values get code -1.
+    
+    Args:
+        series (pandas.Series): Column to encode
+        top_k (int): Maximum number of categories to keep, including 'Others'
+        
+    Returns:
+        tuple: (codes, labels) where codes is a numpy int array aligned with the
+              series and labels lists the category name for each code
+    """
+    codes, uniques = pd.factorize(series, sort=False)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    
+    # Order categories by descending frequency (stable, so ties keep first-seen order)
+    order = np.argsort(-counts, kind='stable')
+    if len(uniques) > top_k:
+        order = order[:top_k - 1]
+        others_code = top_k - 1
+    else:
+        others_code = None
+    
+    remap = np.full(len(uniques), others_code if others_code is not None else -1, dtype=np.int64)
+    remap[order] = np.arange(len(order))
+    codes = np.where(codes >= 0, remap[np.maximum(codes, 0)], -1)
+    
+    labels = [str(uniques[i]) for i in order]
+    if others_code is not None:
+        labels.append('Others')
+    
+    return codes, labels
+
+def crosstab_counts(df, row_field, column_field, top_k):
+    """
+    Count co-occurrences of two fields of a DataFrame.
+    
+    Args:
+        df (pandas.DataFrame): Data to count
+        row_field (str): Field shown on the row axis
+        column_field (str): Field shown on the column axis
+        top_k (int): Maximum number of categories per axis, including 'Others'
+        
+    Returns:
+        tuple: (row_labels, column_labels, counts) where counts is a 2-D numpy
+               array with one row per row label
+    """
+    for field in (row_field, column_field):
+        if field not in df.columns:
+            raise ValueError(f"Field '{field}' not found in the data")
+    
+    row_codes, row_labels = _top_k_codes(df[row_field], top_k)
+    column_codes, column_labels = _top_k_codes(df[column_field], top_k)
+    
+    # Rows with a missing value on either axis are not counted
+    valid = (row_codes >= 0) & (column_codes >= 0)
+    combined = row_codes[valid] * len(column_labels) + column_codes[valid]
+    counts = np.bincount(combined, minlength=len(row_labels) * len(column_labels))
+    return row_labels, column_labels, counts.reshape(len(row_labels), len(column_labels))
+
+def get_crosstab(file_path, row_field, column_field, filters=None, top_k=20):
+    """
+    Count co-occurrences of two fields.
+    
+    Both fields are encoded as integer category codes and counted with a single
+    vectorized bincount over the combined code, so the cost is linear in the
+    number of rows regardless of cardinality. Results are cached per dataset,
+    field pair, filters and top_k.
+    
+    Args:
+        file_path (str): Path to the Excel file
+        row_field (str): Field shown on the row axis
+        column_field (str): Field shown on the column axis
+        filters (dict, optional): Dictionary of filters to apply {column: value}
+        top_k (int): Maximum number of categories per axis, including 'Others'
+        
+    Returns:
+        dict: Cross-tab with 'row_labels', 'column_labels', 'counts' (a list of
+              rows) and 'total' keys
+    """
+    try:
+        cache_key = (
+            file_path,
+            os.path.getmtime(file_path),
+            row_field,
+            column_field,
+            filters_cache_key(filters),
+            top_k
+        )
+        cached = cache_get(_crosstab_cache, cache_key)
+        if cached is not None:
+            return cached
+        
+        from utils import compute_backend
+        if compute_backend.is_enabled():
+            row_labels, column_labels, counts = compute_backend.crosstab(
+                file_path, row_field, column_field, filters, top_k
+            )
+        else:
+            # Only the two fields are taken from the filtered view
+            df = load_dataframe(file_path)
+            columns = [field for field in dict.fromkeys((row_field, column_field)) if field in df.columns]
+            df = select_rows(df[columns], get_filtered_rows(file_path, filters))
+            row_labels, column_labels, counts = crosstab_counts(df, row_field, column_field, top_k)
+        
+        result = {
+            'row_field': row_field,
+            'column_field': column_field,
+            'row_labels': row_labels,
+            'column_labels': column_labels,
+            'counts': counts.tolist(),
+            'total': int(counts.sum())
+        }
+        
+        cache_put(_crosstab_cache, cache_key, result, _CROSSTAB_CACHE_SIZE)
+        return result
+    
+    except Exception as e:
+        logger.error(f"Error generating cross-tab: {str(e)}")
+        raise Exception(f"Error generating cross-tab: {str(e)}")
+
+def _pick_interval(start, end, max_buckets):
+    """
+    Pick the finest resampling interval that keeps the number of buckets
+    between start and end within max_buckets.
+    """
+    span = max((end - start).total_seconds(), 1)
+    for interval, seconds in TIME_SERIES_INTERVALS.items():
+        if span / seconds <= max_buckets:
+            return interval
+    return 'YS'
+
+def _lttb(x, y, threshold):
+    """
+    Downsample a series with the Largest-Triangle-Three-Buckets algorithm.
+    
+    Args:
+        x (numpy.ndarray): Sorted x coordinates as floats
+        y (numpy.ndarray): y coordinates
+        threshold (int): Number of points to keep
+        
+    Returns:
+        numpy.ndarray: Indices of the points to keep
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    
+    # Interior points are split into threshold - 2 buckets of (almost) equal size
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        
+        # Average of the next bucket (or the last point for the final bucket)
+        if i + 2 < len(edges):
+            next_x = x[edges[i + 1]:edges[i + 2]].mean()
+            next_y = y[edges[i + 1]:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        
+        # Keep the point forming the largest triangle with the previously kept point
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        areas = np.abs(
+            (x[selected] - next_x) * (bucket_y - y[selected])
+            - (x[selected] - bucket_x) * (next_y - y[selected])
+        )
+        selected = start + int(np.argmax(areas))
+        indices[i + 1] = selected
+    
+    return indices
+
+def _min_max_decimate(y, threshold):
+    """
+    Downsample a series by keeping the minimum and maximum of each bucket.
+    
+    Args:
+        y (numpy.ndarray): y coordinates
+        threshold (int): Maximum number of points to keep
+        
+    Returns:
+        numpy.ndarray: Sorted indices of the points to keep
+    """
+    n = len(y)
+    if threshold >= n or threshold < 2:
+        return np.arange(n)
+    
+    edges = np.linspace(0, n, threshold // 2 + 1).astype(np.int64)
+    starts = edges[:-1]
+    mins = np.minimum.reduceat(y, starts)
+    maxs = np.maximum.reduceat(y, starts)
+    
+    # reduceat gives the extreme values; locate the first index holding each one
+    bucket = np.repeat(np.arange(len(starts)), np.diff(edges))
+    min_idx = np.flatnonzero(y == mins[bucket])
+    max_idx = np.flatnonzero(y == maxs[bucket])
+    first_min = min_idx[np.unique(bucket[min_idx], return_index=True)[1]]
+    first_max = max_idx[np.unique(bucket[max_idx], return_index=True)[1]]
+    
+    return np.unique(np.concatenate([first_min, first_max]))
+
+def get_time_series(file_path, field, interval=None, max_points=1000, method='lttb', filters=None):
+    """
+    Resample a datetime field into event counts per interval.
+    
+    When no interval is given, the finest interval producing at most ten times
+    max_points buckets is used. The resampled series is then downsampled with
+    LTTB or min/max decimation so at most max_points points are returned.
+    
+    Args:
+        file_path (str): Path to the Excel file
+        field (str): Datetime field to resample
+        interval (str, optional): Pandas offset alias from TIME_SERIES_INTERVALS, or None for automatic
+        max_points (int): Maximum number of points to return
+        method (str): Downsampling method ('lttb' or 'minmax')
+        filters (dict, optional): Dictionary of filters to apply {column: value}
+        
+    Returns:
+        dict: Time series with 'timestamps', 'counts', 'interval', 'method',
+              'total_buckets' and 'total' keys
+    """
+    try:
+        if interval is not None and interval not in TIME_SERIES_INTERVALS:
+            raise ValueError(f"Unsupported time series interval: {interval}")
+        if method not in ('lttb', 'minmax'):
+            raise ValueError(f"Unsupported downsampling method: {method}")
+        
+        cache_key = (
+            file_path,
+            os.path.getmtime(file_path),
+            field,
+            interval,
+            max_points,
+            method,
+            filters_cache_key(filters)
+        )
+        cached = cache_get(_time_series_cache, cache_key)
+        if cached is not None:
+            return cached
+        
+        timestamps = get_field_data(file_path, field, filters)
+        if not pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = pd.to_datetime(timestamps, errors='coerce')
+        timestamps = timestamps.dropna()
+        
+        if timestamps.empty:
+            result = {
+                'field': field,
+                'interval': interval,
+                'method': method,
+                'timestamps': [],
+                'counts': [],
+                'total_buckets': 0,
+                'total': 0
+            }
+            cache_put(_time_series_cache, cache_key, result, _TIME_SERIES_CACHE_SIZE)
+            return result
+        
+        if interval is None:
+            interval = _pick_interval(timestamps.min(), timestamps.max(), max_points * 10)
+        
+        counts = pd.Series(1, index=pd.DatetimeIndex(timestamps)).resample(interval).sum()
+        
+        x = counts.index.asi8.astype(np.float64)
+        y = counts.to_numpy(dtype=np.float64)
+        if method == 'lttb':
+            keep = _lttb(x, y, max_points)
+        else:
+            keep = _min_max_decimate(y, max_points)
+        
+        result = {
+            'field': field,
+            'interval': interval,
+            'method': method,
+            'timestamps': [ts.isoformat() for ts in counts.index[keep]],
+            'counts': counts.iloc[keep].astype(int).tolist(),
+            'total_buckets': len(counts),
+            'total': int(len(timestamps))
+        }
+        
+        cache_put(_time_series_cache, cache_key, result, _TIME_SERIES_CACHE_SIZE)
+        return result
+    
+    except Exception as e:
+        logger.error(f"Error generating time series: {str(e)}")
+        raise Exception(f"Error generating time series: {str(e)}")
@@ -12,10 +12,66 @@ import plotly.io as pio
 import logging
 import json
 from utils.visualizations import generate_visualization
+from utils.excel_processor import load_dataframe, get_frequency_table, get_filtered_rows, select_rows
+from utils.column_stats import get_column_stats, compute_column_stats
+from utils.pdf_charts import chart_drawing, NATIVE_CHART_TYPES
 
 logger = logging.getLogger(__name__)
 
-def export_to_pdf(file_path, fields, visualizations):
+# Frequency tables in PDF reports list at most this many values; the rest are
+# rolled up into a single 'Others' row
+PDF_TABLE_TOP_N = 1000
+
+# Rows per reportlab Table; long tables are split into chunks that each repeat
+# the header, which keeps layout time linear in the number of rows
+PDF_TABLE_CHUNK_ROWS = 250
+
+_FREQUENCY_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+def _frequency_table_flowables(rows, top_n):
+    """
+    Lay out frequency table rows as a sequence of page-sized tables.
+    
+    Args:
+        rows (list): Frequency table rows with 'value', 'count' and 'percentage' keys,
+            most frequent first
+        top_n (int): Maximum number of values listed before the 'Others' rollup
+    
+    Returns:
+        list: reportlab Table flowables, each starting with the header row
+    """
+    header = ['Value', 'Count', 'Percentage (%)']
+    table_rows = [
+        [str(row['value']), str(row['count']), f"{row['percentage']}%"]
+        for row in rows[:top_n]
+    ]
+    
+    rest = rows[top_n:]
+    if rest:
+        others_count = sum(row['count'] for row in rest)
+        others_percentage = round(sum(row['percentage'] for row in rest), 2)
+        table_rows.append([f"Others ({len(rest)} values)", str(others_count), f"{others_percentage}%"])
+    
+    tables = []
+    for start in range(0, max(len(table_rows), 1), PDF_TABLE_CHUNK_ROWS):
+        table = Table(
+            [header] + table_rows[start:start + PDF_TABLE_CHUNK_ROWS],
+            colWidths=[2.5*inch, 1*inch, 1.5*inch],
+            repeatRows=1
+        )
+        table.setStyle(_FREQUENCY_TABLE_STYLE)
+        tables.append(table)
+    return tables
+
+def export_to_pdf(file_path, fields, visualizations, output_path=None, top_n=PDF_TABLE_TOP_N, filters=None):
     """
     Export analysis results to PDF.
     
@@ -24,14 +80,21 @@ def export_to_pdf(file_path, fields, visualizations):
         fields (list): List of fields being analyzed
         visualizations (list): List of visualization configurations
             Each item is a dict with 'field' and 'type' keys
+        output_path (str or file-like, optional): Where to write the PDF, either a
+            path or a writable binary buffer; a temporary file by default
+        top_n (int): Maximum number of values listed in each frequency table; the
+            remaining values are summarized in an 'Others' row
+        filters (dict, optional): Dictionary of filters to apply {column: value};
+            the report covers the matching rows only
         
     Returns:
-        str: Path to the generated PDF file
+        str or file-like: output_path, or the path of the generated temporary file
     """
     try:
         # Generate unique filename
-        output_filename = f"analysis_export_{str(uuid.uuid4())[:8]}.pdf"
-        output_path = os.path.join(tempfile.gettempdir(), output_filename)
+        if output_path is None:
+            output_filename = f"analysis_export_{str(uuid.uuid4())[:8]}.pdf"
+            output_path = os.path.join(tempfile.gettempdir(), output_filename)
         
         # Create PDF document
         doc = SimpleDocTemplate(
@@ -59,6 +122,13 @@ def export_to_pdf(file_path, fields, visualizations):
         # Add original filename
         original_filename = os.path.basename(file_path)
         elements.append(Paragraph(f"Source file: {original_filename}", normal_style))
+        
+        rows = get_filtered_rows(file_path, filters)
+        if rows is not None:
+            elements.append(Paragraph(
+                f"Filtered to {len(rows)} of {len(load_dataframe(file_path))} rows: "
+                f"{json.dumps(filters, default=str)}", normal_style
+            ))
         elements.append(Spacer(1, 0.25 * inch))
         
         # Process each field and visualization
@@ -70,38 +140,35 @@ def export_to_pdf(file_path, fields, visualizations):
             elements.append(Paragraph(f"Analysis of '{field}'", heading_style))
             elements.append(Spacer(1, 0.1 * inch))
             
+            # Pie, bar and treemap charts are drawn as vector graphics straight
+            # from the (cached) frequency table
+            if viz_type in NATIVE_CHART_TYPES:
+                try:
+                    elements.append(chart_drawing(viz_type, field, get_frequency_table(file_path, field, filters=filters)))
+                    elements.append(Spacer(1, 0.25 * inch))
+                    continue
+                except Exception as e:
+                    logger.warning(f"Native rendering of {viz_type} failed, using an image instead: {str(e)}")
+            
             # Generate visualization
-            viz_data = generate_visualization(file_path, field, viz_type)
+            viz_data = generate_visualization(file_path, field, viz_type, filters=filters)
             
             # Add visualization based on type
             if viz_type == 'frequency_table':
                 elements.append(Paragraph(f"Frequency Table:", styles['Heading3']))
                 elements.append(Spacer(1, 0.1 * inch))
                 
-                # Create table data
-                table_data = [['Value', 'Count', 'Percentage (%)']]
-                for row in viz_data['data']:
-                    table_data.append([
-                        str(row['value']), 
-                        str(row['count']), 
-                        f"{row['percentage']}%"
-                    ])
+                table_rows = viz_data['data']
+                if len(table_rows) > top_n:
+                    elements.append(Paragraph(
+                        f"Showing the {top_n} most frequent of {len(table_rows)} values.", normal_style
+                    ))
+                    elements.append(Spacer(1, 0.1 * inch))
                 
-                # Create and style the table
-                table = Table(table_data, colWidths=[2.5*inch, 1*inch, 1.5*inch])
-                table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
-                elements.append(table)
+                elements.extend(_frequency_table_flowables(table_rows, top_n))
             
             else:
-                # For charts, create a temporary image and add it
+                # Other charts are rendered to a temporary image through plotly
                 fig_json = json.dumps(viz_data['data'])
                 fig = pio.from_json(fig_json)
                 
@@ -134,7 +201,7 @@ def export_to_pdf(file_path, fields, visualizations):
         logger.error(f"Error exporting to PDF: {str(e)}")
         raise Exception(f"Error generating PDF export: {str(e)}")
 
-def export_to_excel(file_path, fields, visualizations):
+def export_to_excel(file_path, fields, visualizations, output_path=None, filters=None):
     """
     Export analysis results to Excel.
     
@@ -143,41 +210,51 @@ def export_to_excel(file_path, fields, visualizations):
         fields (list): List of fields being analyzed
         visualizations (list): List of visualization configurations
             Each item is a dict with 'field' and 'type' keys
+        output_path (str, optional): Where to write the workbook; a temporary file by default
+        filters (dict, optional): Dictionary of filters to apply {column: value};
+            the workbook covers the matching rows only
         
     Returns:
         str: Path to the generated Excel file
     """
     try:
         # Generate unique filename
-        output_filename = f"analysis_export_{str(uuid.uuid4())[:8]}.xlsx"
-        output_path = os.path.join(tempfile.gettempdir(), output_filename)
+        if output_path is None:
+            output_filename = f"analysis_export_{str(uuid.uuid4())[:8]}.xlsx"
+            output_path = os.path.join(tempfile.gettempdir(), output_filename)
+        
+        rows = get_filtered_rows(file_path, filters)
+        
+        # Summary sheets are built from the ingest-time statistics catalog; with
+        # filters, statistics of the exported fields are computed over the view
+        if rows is None:
+            column_stats = get_column_stats(file_path)
+        else:
+            exported_fields = [viz_config['field'] for viz_config in visualizations]
+            fields_df = load_dataframe(file_path)[list(dict.fromkeys(exported_fields))]
+            column_stats = compute_column_stats(select_rows(fields_df, rows))
         
         # Create Excel writer
         with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
             # Read original data
-            if file_path.endswith('.csv'):
-                original_df = pd.read_csv(file_path)
-            else:
-                original_df = pd.read_excel(file_path)
+            original_df = select_rows(load_dataframe(file_path), rows)
             
             # Add original data sheet
-            original_df.to_excel(writer, sheet_name='Original Data', index=False)
+            original_df.to_excel(writer, sheet_name='Original Data' if rows is None else 'Filtered Data', index=False)
             
             # Process each visualization
             for viz_config in visualizations:
                 field = viz_config['field']
                 viz_type = viz_config['type']
                 
-                # Generate visualization data
-                viz_data = generate_visualization(file_path, field, viz_type)
-                
                 # Create sheet name (combine field and viz type)
                 sheet_name = f"{field[:20]}_{viz_type[:10]}"
                 
                 # For frequency tables, export as a sheet
                 if viz_type == 'frequency_table':
                     # Create dataframe from frequency data
-                    freq_df = pd.DataFrame(viz_data['data'])
+                    viz_data = generate_visualization(file_path, field, viz_type, filters=filters)
+                    freq_df = pd.DataFrame(viz_data['data'], columns=['value', 'count', 'percentage'])
                     freq_df.to_excel(writer, sheet_name=sheet_name, index=False)
                     
                     # Get workbook and worksheet objects
@@ -215,17 +292,12 @@ def export_to_excel(file_path, fields, visualizations):
                 # For other visualizations, we can't directly add charts from plotly
                 # So we'll create summary sheets with key statistics
                 else:
-                    # Get the field data
-                    if file_path.endswith('.csv'):
-                        field_df = pd.read_csv(file_path)
-                    else:
-                        field_df = pd.read_excel(file_path)
-                    
                     # Create summary statistics
-                    field_data = field_df[field]
+                    field_stats = column_stats[field]
+                    top_values = field_stats['top_values']
                     
                     # Check if numeric or categorical
-                    if pd.api.types.is_numeric_dtype(field_data):
+                    if 'mean' in field_stats:
                         # Numeric summary
                         summary_data = {
                             'Statistic': [
@@ -233,25 +305,24 @@ def export_to_excel(file_path, fields, visualizations):
                                 'Standard Deviation', 'Minimum', 'Maximum'
                             ],
                             'Value': [
-                                field_data.count(),
-                                field_data.mean(),
-                                field_data.median(),
-                                field_data.mode().iloc[0] if not field_data.mode().empty else None,
-                                field_data.std(),
-                                field_data.min(),
-                                field_data.max()
+                                field_stats['count'],
+                                field_stats['mean'],
+                                field_stats['quantiles']['0.5'],
+                                top_values[0]['value'] if top_values else None,
+                                field_stats['std'],
+                                field_stats['min'],
+                                field_stats['max']
                             ]
                         }
                     else:
                         # Categorical summary (top 10 categories)
-                        value_counts = field_data.value_counts().reset_index()
-                        value_counts.columns = ['Category', 'Count']
-                        value_counts = value_counts.head(10)
-                        
                         summary_data = {
-                            'Category': value_counts['Category'].tolist(),
-                            'Count': value_counts['Count'].tolist(),
-                            'Percentage': ((value_counts['Count'] / field_data.count()) * 100).round(2).tolist()
+                            'Category': [item['value'] for item in top_values],
+                            'Count': [item['count'] for item in top_values],
+                            'Percentage': [
+                                round(item['count'] / field_stats['count'] * 100, 2) if field_stats['count'] else 0
+                                for item in top_values
+                            ]
                         }
                     
                     # Create summary dataframe and write to Excel
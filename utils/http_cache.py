@@ -0,0 +1,91 @@
+import gzip
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Brotli is optional; responses fall back to gzip when it is not installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bump whenever the shape of /analyze or /filter responses changes so that
+# clients holding an old ETag receive the new format
+RESULT_KEY_VERSION = '1'
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/css', 'application/javascript'}
+
+def compute_file_hash(file_path, chunk_size=1024 * 1024):
+    """
+    Compute a content hash for a data file.
+    
+    Args:
+        file_path (str): Path to the file
+        chunk_size (int): Number of bytes read at a time
+    
+    Returns:
+        str: Hex SHA-256 digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def make_result_key(*parts):
+    """
+    Build a deterministic key for a computed result.
+    
+    Args:
+        *parts: JSON-serializable values identifying the result, typically the
+            dataset content hash followed by the request parameters
+    
+    Returns:
+        str: Hex digest that is identical for identical inputs
+    """
+    payload = json.dumps([RESULT_KEY_VERSION, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+def compress_response(response, accept_encoding):
+    """
+    Compress a response body with brotli or gzip when the client accepts it.
+    
+    Streamed responses, small bodies and non-text content are left untouched.
+    
+    Args:
+        response (flask.Response): Response to compress in place
+        accept_encoding (werkzeug.datastructures.Accept): Parsed Accept-Encoding header of the request
+    
+    Returns:
+        flask.Response: The same response object
+    """
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_SIZE:
+        return response
+    
+    if brotli is not None and 'br' in accept_encoding:
+        compressed = brotli.compress(body, quality=5)
+        encoding = 'br'
+    elif 'gzip' in accept_encoding:
+        compressed = gzip.compress(body, compresslevel=6)
+        encoding = 'gzip'
+    else:
+        return response
+    
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    logger.debug(f"Compressed response from {len(body)} to {len(compressed)} bytes ({encoding})")
+    return response
@@ -0,0 +1,255 @@
+import logging
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.graphics.shapes import Drawing, Rect, String
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.charts.barcharts import HorizontalBarChart
+from reportlab.graphics.charts.legends import Legend
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from utils.visualizations import limit_categories, PIE_CHART_MAX_SLICES, BAR_CHART_MAX_BARS
+
+logger = logging.getLogger(__name__)
+
+# Chart types drawn natively from frequency data; other types are rendered
+# through plotly's image export
+NATIVE_CHART_TYPES = ('pie_chart', 'bar_chart', 'treemap')
+
+# Treemaps in print only label readable tiles, so keep the largest values
+TREEMAP_MAX_TILES = 40
+
+# Drawing size, matching the images produced by the plotly path
+CHART_WIDTH = 6 * inch
+CHART_HEIGHT = 4 * inch
+
+# plotly's qualitative 'Bold' palette, as used by the interactive treemap
+PALETTE = [colors.HexColor(value) for value in (
+    '#7F3C8D', '#11A579', '#3969AC', '#F2B701', '#E73F74', '#80BA5A',
+    '#E68310', '#008695', '#CF1C90', '#F97B72', '#A5AA99'
+)]
+
+def _fit_text(text, font_size, max_width, font_name='Helvetica'):
+    """Truncate text with an ellipsis so it fits in max_width points."""
+    text = str(text)
+    if stringWidth(text, font_name, font_size) <= max_width:
+        return text
+    while text and stringWidth(text + '…', font_name, font_size) > max_width:
+        text = text[:-1]
+    return text + '…' if text else ''
+
+def _new_drawing(title):
+    drawing = Drawing(CHART_WIDTH, CHART_HEIGHT)
+    drawing.add(String(
+        CHART_WIDTH / 2, CHART_HEIGHT - 14, title,
+        fontName='Helvetica-Bold', fontSize=12, textAnchor='middle'
+    ))
+    return drawing
+
+def _add_no_data(drawing):
+    """Mark a chart of an empty frequency table (e.g. a filter matching no rows)."""
+    drawing.add(String(
+        CHART_WIDTH / 2, CHART_HEIGHT / 2, 'No data',
+        fontName='Helvetica', fontSize=10, textAnchor='middle', fillColor=colors.grey
+    ))
+    return drawing
+
+def pie_chart_drawing(field, frequency_data):
+    """
+    Draw a pie chart of a field's value distribution as vector graphics.
+    
+    Args:
+        field (str): Field being charted
+        frequency_data (list): Frequency table rows of the field
+    
+    Returns:
+        reportlab.graphics.shapes.Drawing: Chart ready to be added to a PDF story
+    """
+    items = [item for item in limit_categories(frequency_data, PIE_CHART_MAX_SLICES) if item['count'] > 0]
+    drawing = _new_drawing(f'Distribution of {field}')
+    if not items:
+        return _add_no_data(drawing)
+    
+    pie = Pie()
+    pie.x, pie.y = 20, 30
+    pie.width = pie.height = CHART_HEIGHT - 70
+    pie.data = [item['count'] for item in items]
+    # Percentages are shown on slices large enough to hold them
+    pie.labels = [f"{item['percentage']:.1f}%" if item['percentage'] >= 3 else '' for item in items]
+    pie.simpleLabels = 1
+    pie.slices.strokeColor = colors.white
+    pie.slices.strokeWidth = 0.5
+    pie.slices.fontSize = 8
+    pie.slices.labelRadius = 0.7
+    pie.slices.fontColor = colors.white
+    for index in range(len(items)):
+        pie.slices[index].fillColor = PALETTE[index % len(PALETTE)]
+    drawing.add(pie)
+    
+    legend = Legend()
+    legend.x = pie.x + pie.width + 30
+    legend.y = pie.y + pie.height
+    legend.alignment = 'right'
+    legend.fontSize = 8
+    legend.dx = legend.dy = 8
+    legend.deltay = 12
+    legend.boxAnchor = 'nw'
+    legend.columnMaximum = len(items)
+    legend.colorNamePairs = [
+        (PALETTE[index % len(PALETTE)], _fit_text(item['value'], 8, 120))
+        for index, item in enumerate(items)
+    ]
+    drawing.add(legend)
+    return drawing
+
+def bar_chart_drawing(field, frequency_data):
+    """
+    Draw a horizontal bar chart of a field's value counts as vector graphics.
+    
+    Args:
+        field (str): Field being charted
+        frequency_data (list): Frequency table rows of the field
+    
+    Returns:
+        reportlab.graphics.shapes.Drawing: Chart ready to be added to a PDF story
+    """
+    # Most frequent value at the top; the first category is drawn at the bottom
+    items = sorted(limit_categories(frequency_data, BAR_CHART_MAX_BARS), key=lambda item: item['count'])
+    drawing = _new_drawing(f'Distribution of {field}')
+    if not items:
+        return _add_no_data(drawing)
+    
+    chart = HorizontalBarChart()
+    chart.x, chart.y = 120, 35
+    chart.width = CHART_WIDTH - chart.x - 20
+    chart.height = CHART_HEIGHT - chart.y - 30
+    chart.data = [[item['count'] for item in items]]
+    chart.bars[0].fillColor = PALETTE[2]
+    chart.bars[0].strokeColor = None
+    chart.barSpacing = 1
+    chart.categoryAxis.categoryNames = [_fit_text(item['value'], 7, chart.x - 10) for item in items]
+    chart.categoryAxis.labels.fontSize = 7
+    chart.categoryAxis.labels.boxAnchor = 'e'
+    chart.categoryAxis.labels.dx = -4
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.labels.fontSize = 7
+    chart.valueAxis.visibleGrid = 1
+    chart.valueAxis.gridStrokeColor = colors.lightgrey
+    drawing.add(chart)
+    
+    drawing.add(String(
+        chart.x + chart.width / 2, 8, 'Count',
+        fontName='Helvetica', fontSize=8, textAnchor='middle'
+    ))
+    return drawing
+
+def _worst_ratio(areas, side):
+    """Worst aspect ratio of a row of tile areas laid along a side of given length."""
+    total = sum(areas)
+    return max(max(side * side * area / (total * total), total * total / (side * side * area)) for area in areas)
+
+def squarify(values, x, y, width, height):
+    """
+    Lay out values as rectangles filling a box, keeping tiles close to square.
+    
+    Implements the squarified treemap algorithm (Bruls, Huizing and van Wijk):
+    tiles are added to the current row along the shorter side of the remaining
+    box for as long as that does not worsen the row's worst aspect ratio.
+    
+    Args:
+        values (list): Positive sizes, largest first
+        x, y, width, height (float): Box to fill
+    
+    Returns:
+        list: (x, y, width, height) of each value's rectangle, in input order
+    """
+    total = sum(values)
+    areas = [value * width * height / total for value in values]
+    rectangles = []
+    index = 0
+    while index < len(areas):
+        side = min(width, height)
+        row = [areas[index]]
+        index += 1
+        while index < len(areas) and _worst_ratio(row + [areas[index]], side) <= _worst_ratio(row, side):
+            row.append(areas[index])
+            index += 1
+        
+        thickness = sum(row) / side
+        if width >= height:
+            # Fill a column on the left, top to bottom
+            top = y + height
+            for area in row:
+                length = area / thickness
+                top -= length
+                rectangles.append((x, top, thickness, length))
+            x += thickness
+            width -= thickness
+        else:
+            # Fill a row along the top, left to right
+            left = x
+            for area in row:
+                length = area / thickness
+                rectangles.append((left, y + height - thickness, length, thickness))
+                left += length
+            height -= thickness
+    return rectangles
+
+def treemap_drawing(field, frequency_data):
+    """
+    Draw a squarified treemap of a field's value counts as vector graphics.
+    
+    Args:
+        field (str): Field being charted
+        frequency_data (list): Frequency table rows of the field
+    
+    Returns:
+        reportlab.graphics.shapes.Drawing: Chart ready to be added to a PDF story
+    """
+    # Largest tiles first, as squarify expects; 'Others' may be among the largest
+    items = sorted(
+        (item for item in limit_categories(frequency_data, TREEMAP_MAX_TILES) if item['count'] > 0),
+        key=lambda item: item['count'], reverse=True
+    )
+    drawing = _new_drawing(f'Treemap of {field}')
+    if not items:
+        return _add_no_data(drawing)
+    
+    rectangles = squarify([item['count'] for item in items], 0, 0, CHART_WIDTH, CHART_HEIGHT - 25)
+    for index, (item, (x, y, width, height)) in enumerate(zip(items, rectangles)):
+        drawing.add(Rect(
+            x, y, width, height,
+            fillColor=PALETTE[index % len(PALETTE)], strokeColor=colors.white, strokeWidth=1
+        ))
+        # Label tiles that are large enough to hold a name and a count
+        if width >= 30 and height >= 22:
+            font_size = 9 if width >= 80 and height >= 30 else 7
+            drawing.add(String(
+                x + 4, y + height - font_size - 3, _fit_text(item['value'], font_size, width - 8),
+                fontName='Helvetica-Bold', fontSize=font_size, fillColor=colors.white
+            ))
+            drawing.add(String(
+                x + 4, y + height - 2 * font_size - 5, _fit_text(f"{item['count']:,}", font_size, width - 8),
+                fontName='Helvetica', fontSize=font_size, fillColor=colors.white
+            ))
+    return drawing
+
+def chart_drawing(visualization_type, field, frequency_data):
+    """
+    Draw a chart of one of the NATIVE_CHART_TYPES from frequency data.
+    
+    Args:
+        visualization_type (str): 'pie_chart', 'bar_chart' or 'treemap'
+        field (str): Field being charted
+        frequency_data (list): Frequency table rows of the field, as returned by
+            get_frequency_table
+    
+    Returns:
+        reportlab.graphics.shapes.Drawing: Chart ready to be added to a PDF story
+    """
+    builders = {
+        'pie_chart': pie_chart_drawing,
+        'bar_chart': bar_chart_drawing,
+        'treemap': treemap_drawing
+    }
+    if visualization_type not in builders:
+        raise ValueError(f"No native rendering for visualization type: {visualization_type}")
+    return builders[visualization_type](field, frequency_data)
@@ -0,0 +1,262 @@
+import os
+import json
+import zlib
+import logging
+from datetime import datetime, timezone
+from importlib import metadata
+from flask import has_app_context
+from utils.http_cache import make_result_key, RESULT_KEY_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the format of a stored result changes; rows written by other
+# versions are ignored and deleted by maintain_result_store
+RESULT_STORE_VERSION = '1'
+
+# Oldest results are pruned beyond this many rows whenever a result is stored
+MAX_STORED_RESULTS = 20000
+
+# flask-sqlalchemy is optional and only imported when the store is opened, so
+# importing the app stays cheap; without it computed results are not persisted
+_state = {'enabled': False, 'db': None, 'model': None, 'code_version': None}
+
+def _load_model():
+    """
+    Import flask-sqlalchemy and define the store's model, once.
+    
+    Returns:
+        tuple: (db, StoredResult), or (None, None) when flask-sqlalchemy is not installed
+    """
+    if _state['db'] is None:
+        try:
+            from flask_sqlalchemy import SQLAlchemy
+        except ImportError:
+            return None, None
+        
+        db = SQLAlchemy()
+        
+        class StoredResult(db.Model):
+            """A computed result, stored as zlib-compressed JSON."""
+            __tablename__ = 'analysis_results'
+            
+            key = db.Column(db.String(32), primary_key=True)
+            kind = db.Column(db.String(32), nullable=False)
+            dataset_hash = db.Column(db.String(64), nullable=False, index=True)
+            code_version = db.Column(db.String(64), nullable=False, index=True)
+            payload = db.Column(db.LargeBinary, nullable=False)
+            created_at = db.Column(db.DateTime, nullable=False, index=True)
+        
+        _state['db'], _state['model'] = db, StoredResult
+    return _state['db'], _state['model']
+
+def _library_version(name):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return 'none'
+
+def code_version():
+    """
+    Identify the code that produced a result.
+    
+    Combines the store and response format versions with the pandas and plotly
+    versions, since upgrading either can change computed values or figures.
+    
+    Returns:
+        str: Version string recorded with every stored result
+    """
+    if _state['code_version'] is None:
+        _state['code_version'] = (f"{RESULT_STORE_VERSION}.{RESULT_KEY_VERSION}"
+                                  f"-pandas{_library_version('pandas')}-plotly{_library_version('plotly')}")
+    return _state['code_version']
+
+def result_store_uri(instance_path):
+    """
+    Return the SQLAlchemy URI of the result store.
+    
+    Args:
+        instance_path (str): The app's instance folder
+    
+    Returns:
+        str: RESULT_STORE_URI when set (empty to disable the store), otherwise a
+            SQLite database in the instance folder
+    """
+    return os.environ.get('RESULT_STORE_URI', 'sqlite:///' + os.path.join(instance_path, 'results.db'))
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets every gunicorn worker read while one of them writes
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+def _prune(connection, table):
+    """Delete the oldest results beyond MAX_STORED_RESULTS; return the number deleted."""
+    from sqlalchemy import select, delete
+    
+    cutoff = connection.execute(
+        select(table.c.created_at).order_by(table.c.created_at.desc()).offset(MAX_STORED_RESULTS).limit(1)
+    ).scalar()
+    if cutoff is None:
+        return 0
+    return connection.execute(delete(table).where(table.c.created_at <= cutoff)).rowcount
+
+def maintain_result_store(uri):
+    """
+    Create the result store's table and delete stale and surplus results.
+    
+    Meant to run once per server start, before the workers serve requests
+    (see on_starting in gunicorn.conf.py), rather than in every worker.
+    Results written by another code version are deleted, and the oldest
+    results beyond MAX_STORED_RESULTS.
+    
+    Args:
+        uri (str): SQLAlchemy URI of the store, as returned by result_store_uri
+    """
+    db, StoredResult = _load_model()
+    if db is None or not uri:
+        return
+    
+    from sqlalchemy import create_engine, delete, event
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.exc import SQLAlchemyError
+    
+    try:
+        url = make_url(uri)
+        if url.get_backend_name() == 'sqlite' and url.database:
+            os.makedirs(os.path.dirname(os.path.abspath(url.database)), exist_ok=True)
+        
+        engine = create_engine(url)
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', _set_sqlite_pragmas)
+        try:
+            table = StoredResult.__table__
+            table.create(engine, checkfirst=True)
+            with engine.begin() as connection:
+                stale = connection.execute(delete(table).where(table.c.code_version != code_version())).rowcount
+                pruned = _prune(connection, table)
+        finally:
+            engine.dispose()
+        
+        if stale or pruned:
+            logger.info(f"Removed {stale} stale and {pruned} old results from the result store")
+    
+    except SQLAlchemyError as e:
+        logger.error(f"Error maintaining result store: {str(e)}")
+
+def init_result_store(app):
+    """
+    Attach the persistent result store to the app.
+    
+    The store is configured by the app's SQLALCHEMY_DATABASE_URI; it stays
+    disabled when that is empty or flask-sqlalchemy is not installed. Must be
+    called before the app serves its first request (warmup() and
+    gunicorn.conf.py do); calling it again has no effect. The table is created
+    by maintain_result_store.
+    
+    Args:
+        app (flask.Flask): Application to configure
+    """
+    if 'sqlalchemy' in app.extensions:
+        return
+    if not app.config.get('SQLALCHEMY_DATABASE_URI'):
+        logger.info("No result store configured, computed results will not be persisted")
+        return
+    db, _ = _load_model()
+    if db is None:
+        logger.info("flask-sqlalchemy is not installed, computed results will not be persisted")
+        return
+    
+    from sqlalchemy import event
+    
+    db.init_app(app)
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _set_sqlite_pragmas)
+    _state['enabled'] = True
+
+def is_active():
+    """Return True when results can be loaded and stored in the current context."""
+    return _state['enabled'] and has_app_context()
+
+def load_result(kind, dataset_hash, *params):
+    """
+    Look up a stored result.
+    
+    Args:
+        kind (str): Kind of result, e.g. 'column_stats' or 'visualization'
+        dataset_hash (str): Content hash of the dataset
+        *params: JSON-serializable parameters of the computation
+    
+    Returns:
+        The stored result, or None when it has not been stored
+    """
+    if not is_active() or not dataset_hash:
+        return None
+    
+    from sqlalchemy.exc import SQLAlchemyError
+    
+    db, StoredResult = _state['db'], _state['model']
+    key = make_result_key(code_version(), kind, dataset_hash, *params)
+    try:
+        row = db.session.get(StoredResult, key)
+    except SQLAlchemyError as e:
+        logger.warning(f"Error reading result store: {str(e)}")
+        db.session.rollback()
+        return None
+    
+    if row is None:
+        return None
+    logger.debug(f"Loaded stored {kind} result {key}")
+    return json.loads(zlib.decompress(row.payload))
+
+def save_result(kind, dataset_hash, result, *params):
+    """
+    Store a result and prune the oldest ones beyond MAX_STORED_RESULTS;
+    failures are logged and otherwise ignored.
+    
+    Args:
+        kind (str): Kind of result, e.g. 'column_stats' or 'visualization'
+        dataset_hash (str): Content hash of the dataset
+        result: JSON-serializable result
+        *params: JSON-serializable parameters of the computation
+    """
+    if not is_active() or not dataset_hash:
+        return
+    
+    from sqlalchemy.exc import SQLAlchemyError
+    
+    db, StoredResult = _state['db'], _state['model']
+    key = make_result_key(code_version(), kind, dataset_hash, *params)
+    try:
+        payload = zlib.compress(json.dumps(result, default=str).encode('utf-8'))
+        db.session.add(StoredResult(
+            key=key, kind=kind, dataset_hash=dataset_hash, code_version=code_version(),
+            payload=payload, created_at=datetime.now(timezone.utc).replace(tzinfo=None)
+        ))
+        db.session.flush()
+        _prune(db.session, StoredResult.__table__)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        # Most likely another worker stored the same result first
+        logger.debug(f"Result {key} not stored: {str(e)}")
+        db.session.rollback()
+
+def get_or_compute(kind, dataset_hash, params, compute):
+    """
+    Return a stored result, computing and storing it on first use.
+    
+    Args:
+        kind (str): Kind of result, e.g. 'column_stats' or 'visualization'
+        dataset_hash (str): Content hash of the dataset
+        params (list): JSON-serializable parameters of the computation
+        compute (callable): Function producing the result when it is not stored
+    
+    Returns:
+        The stored or freshly computed result
+    """
+    result = load_result(kind, dataset_hash, *params)
+    if result is None:
+        result = compute()
+        save_result(kind, dataset_hash, result, *params)
+    return result
@@ -0,0 +1,180 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Parquet output needs pyarrow, which is optional
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Rows serialized per chunk of a streamed download
+STREAM_BATCH_ROWS = 50000
+
+# Bytes per chunk when streaming an in-memory file
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Kinds of object columns (as reported by pandas.api.types.infer_dtype) that
+# Parquet stores natively; any other object column is written as text
+_PARQUET_OBJECT_KINDS = ('integer', 'floating', 'mixed-integer-float', 'boolean', 'date', 'datetime', 'bytes')
+
+STREAM_FORMATS = {
+    'csv': {'mimetype': 'text/csv', 'extension': 'csv'},
+    'parquet': {'mimetype': 'application/vnd.apache.parquet', 'extension': 'parquet'}
+}
+
+def parquet_available():
+    """Return True when pyarrow is installed and Parquet downloads can be served."""
+    return pq is not None
+
+class _ChunkSink:
+    """Write-only file object that collects bytes until they are drained."""
+    
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.position
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def iter_buffer(buffer, chunk_size=STREAM_CHUNK_BYTES):
+    """
+    Stream the contents of an in-memory binary buffer.
+    
+    The buffer's position is not used, so several responses can stream the
+    same buffer at once as long as nothing writes to it.
+    
+    Args:
+        buffer (io.BytesIO): Buffer holding a generated file
+        chunk_size (int): Bytes per yielded chunk
+    
+    Yields:
+        bytes: Consecutive pieces of the buffer, from the start
+    """
+    view = buffer.getbuffer()
+    try:
+        for start in range(0, len(view), chunk_size):
+            yield bytes(view[start:start + chunk_size])
+    finally:
+        view.release()
+
+def _batches(df, rows, batch_size):
+    row_indices = np.arange(len(df)) if rows is None else rows
+    for start in range(0, len(row_indices), batch_size):
+        yield row_indices[start:start + batch_size]
+
+def iter_csv(df, rows, batch_size=STREAM_BATCH_ROWS):
+    """
+    Stream the selected rows as CSV, one batch at a time.
+    
+    Only the current batch of rows is ever copied out of the DataFrame.
+    
+    Args:
+        df (pandas.DataFrame): Full dataset
+        rows (numpy.ndarray): Positions of the rows to write, e.g. a filtered view,
+            or None for every row
+        batch_size (int): Rows serialized per yielded chunk
+    
+    Yields:
+        str: CSV text, starting with the header row
+    """
+    yield df.iloc[:0].to_csv(index=False)
+    for batch in _batches(df, rows, batch_size):
+        yield df.take(batch).to_csv(index=False, header=False)
+
+def parquet_schema(df, sample_rows=STREAM_BATCH_ROWS):
+    """
+    Build the Parquet schema of a dataset before any of it is streamed.
+    
+    Object columns that hold text, mixed types (e.g. numbers and 'unknown' in a
+    spreadsheet column) or only missing values are typed as strings, so a value
+    further down a column cannot fail the download after it has started. Other
+    columns are typed from a sample of their values.
+    
+    Args:
+        df (pandas.DataFrame): Full dataset
+        sample_rows (int): Number of values used to type each column
+    
+    Returns:
+        pyarrow.Schema: Schema to pass to iter_parquet
+    
+    Raises:
+        pyarrow.ArrowException: When a column cannot be represented in Parquet
+    """
+    if pa is None:
+        raise RuntimeError('Parquet export requires the pyarrow package')
+    
+    fields = []
+    for column in df.columns:
+        series = df[column]
+        if series.dtype == object:
+            if pd.api.types.infer_dtype(series, skipna=True) in _PARQUET_OBJECT_KINDS:
+                arrow_type = pa.array(series.dropna().head(sample_rows), from_pandas=True).type
+            else:
+                arrow_type = pa.string()
+        else:
+            arrow_type = pa.array(series.head(sample_rows), from_pandas=True).type
+        fields.append(pa.field(str(column), arrow_type))
+    return pa.schema(fields)
+
+def _as_text(series):
+    """Convert the non-missing values of an object column to strings."""
+    return series.where(series.isna(), series.astype(str))
+
+def iter_parquet(df, rows, schema, batch_size=STREAM_BATCH_ROWS):
+    """
+    Stream the selected rows as a Parquet file, one row group per batch.
+    
+    Args:
+        df (pandas.DataFrame): Full dataset
+        rows (numpy.ndarray): Positions of the rows to write, e.g. a filtered view,
+            or None for every row
+        schema (pyarrow.Schema): Schema built by parquet_schema before the
+            response was started
+        batch_size (int): Rows per row group
+    
+    Yields:
+        bytes: Consecutive pieces of the Parquet file
+    """
+    if pq is None:
+        raise RuntimeError('Parquet export requires the pyarrow package')
+    
+    text_columns = [
+        column for column, field in zip(df.columns, schema)
+        if field.type == pa.string() and df[column].dtype == object
+    ]
+    
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in _batches(df, rows, batch_size):
+            part = df.take(batch)
+            if text_columns:
+                part = part.assign(**{column: _as_text(part[column]) for column in text_columns})
+            table = pa.Table.from_pandas(part, schema=schema, preserve_index=False)
+            writer.write_table(table)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -1,38 +1,63 @@
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import plotly.io as pio
 import json
 import base64
 from io import BytesIO
 import logging
-from utils.excel_processor import get_field_data, get_frequency_table
+from utils.excel_processor import get_field_data, get_frequency_table, get_crosstab, get_time_series
 
 logger = logging.getLogger(__name__)
 
-def generate_visualization(file_path, field, visualization_type):
+# Plotly is imported inside the chart builders rather than at module level so
+# that importing this module (and the app) stays cheap; see warmup() in app.py
+
+# Visualizations that compare two fields against each other
+CROSSTAB_VISUALIZATION_TYPES = ('heatmap', 'stacked_bar', 'grouped_bar')
+
+# Charts that can be sent in the compact format: only the aggregated arrays
+# and the id of the client-side spec (static/js/app.js) that turns them into a
+# plotly figure. Bump a spec's version when the payload it expects changes.
+COMPACT_CHART_SPECS = {
+    'pie_chart': 'pie_chart@1',
+    'bar_chart': 'bar_chart@1',
+    'treemap': 'treemap@1'
+}
+
+# Number of categories shown before the rest are grouped as 'Others'
+PIE_CHART_MAX_SLICES = 10
+BAR_CHART_MAX_BARS = 20
+
+def generate_visualization(file_path, field, visualization_type, interval=None, compact=False, filters=None):
     """
     Generate visualization for a field.
     
     Args:
         file_path (str): Path to the Excel file
         field (str): Field to visualize
-        visualization_type (str): Type of visualization (frequency_table, pie_chart, bar_chart, treemap)
+        visualization_type (str): Type of visualization (frequency_table, pie_chart, bar_chart, treemap, time_series)
+        interval (str, optional): Resampling interval for time series, or None to pick one automatically
+        compact (bool): Return charts listed in COMPACT_CHART_SPECS in the compact
+            format instead of as full plotly figures
+        filters (dict, optional): Dictionary of filters to apply {column: value};
+            the chart is computed from the matching rows only
         
     Returns:
         dict: Visualization data that can be rendered by the frontend
     """
     try:
+        if compact and visualization_type in COMPACT_CHART_SPECS:
+            return generate_compact_chart(file_path, field, visualization_type, filters=filters)
+        
         # Process data based on visualization type
         if visualization_type == 'frequency_table':
-            return generate_frequency_table(file_path, field)
+            return generate_frequency_table(file_path, field, filters=filters)
         elif visualization_type == 'pie_chart':
-            return generate_pie_chart(file_path, field)
+            return generate_pie_chart(file_path, field, filters=filters)
         elif visualization_type == 'bar_chart':
-            return generate_bar_chart(file_path, field)
+            return generate_bar_chart(file_path, field, filters=filters)
         elif visualization_type == 'treemap':
-            return generate_treemap(file_path, field)
+            return generate_treemap(file_path, field, filters=filters)
+        elif visualization_type == 'time_series':
+            return generate_time_series(file_path, field, interval=interval, filters=filters)
         else:
             raise ValueError(f"Unsupported visualization type: {visualization_type}")
     
@@ -40,19 +65,98 @@ def generate_visualization(file_path, field, visualization_type):
         logger.error(f"Error generating visualization: {str(e)}")
         raise Exception(f"Error generating visualization: {str(e)}")
 
-def generate_frequency_table(file_path, field):
+def limit_categories(frequency_data, limit):
+    """
+    Keep the limit - 1 most frequent values and group the rest as 'Others'.
+    
+    Args:
+        frequency_data (list): Frequency table rows with 'value', 'count' and 'percentage' keys
+        limit (int): Maximum number of rows returned
+        
+    Returns:
+        list: Frequency table rows, most frequent first when grouping happened
+    """
+    if len(frequency_data) <= limit:
+        return frequency_data
+    
+    items = sorted(frequency_data, key=lambda x: x['count'], reverse=True)
+    other_items = items[limit - 1:]
+    return items[:limit - 1] + [{
+        'value': 'Others',
+        'count': sum(item['count'] for item in other_items),
+        'percentage': sum(item['percentage'] for item in other_items)
+    }]
+
+def generate_compact_chart(file_path, field, visualization_type, filters=None):
+    """
+    Generate a chart in the compact format.
+    
+    Only the aggregated arrays are sent; the browser builds the plotly figure
+    from the spec named by 'spec' and the cached chart template (see
+    /chart_template), so the payload carries no layout or template boilerplate.
+    
+    Args:
+        file_path (str): Path to the Excel file
+        field (str): Field to visualize
+        visualization_type (str): One of the COMPACT_CHART_SPECS keys
+        filters (dict, optional): Dictionary of filters to apply {column: value}
+        
+    Returns:
+        dict: Chart data with 'labels', 'counts' and 'percentages' arrays
+    """
+    try:
+        frequency_data = get_frequency_table(file_path, field, filters=filters)
+        
+        if visualization_type == 'pie_chart':
+            frequency_data = limit_categories(frequency_data, PIE_CHART_MAX_SLICES)
+        elif visualization_type == 'bar_chart':
+            frequency_data = sorted(limit_categories(frequency_data, BAR_CHART_MAX_BARS), key=lambda x: x['count'])
+        elif not frequency_data:
+            return {
+                'type': visualization_type,
+                'field': field,
+                'error': 'No data available for treemap visualization'
+            }
+        
+        return {
+            'type': visualization_type,
+            'field': field,
+            'format': 'compact',
+            'spec': COMPACT_CHART_SPECS[visualization_type],
+            'labels': [str(item['value']) for item in frequency_data],
+            'counts': [int(item['count']) for item in frequency_data],
+            'percentages': [round(float(item['percentage']), 2) for item in frequency_data]
+        }
+    
+    except Exception as e:
+        logger.error(f"Error generating compact chart: {str(e)}")
+        raise Exception(f"Error generating {visualization_type}: {str(e)}")
+
+def get_chart_template():
+    """
+    Get the plotly template that compact charts are rendered with.
+    
+    Returns:
+        dict: The expanded 'plotly_dark' template as plain JSON data
+    """
+    import plotly.io as pio
+    
+    return json.loads(pio.json.to_json_plotly(pio.templates['plotly_dark'].to_plotly_json()))
+
+def generate_frequency_table(file_path, field, filters=None):
     """
     Generate a frequency table for a field.
     
     Args:
         file_path (str): Path to the Excel file
         field (str): Field to analyze
+        filters (dict, optional): Dictionary of filters to apply {column: value}
         
     Returns:
         dict: Frequency table data
     """
     try:
-        frequency_data = get_frequency_table(file_path, field)
+        frequency_data = get_frequency_table(file_path, field, filters=filters)
         
         return {
             'type': 'frequency_table',
@@ -64,35 +168,27 @@ def generate_frequency_table(file_path, field):
         logger.error(f"Error generating frequency table visualization: {str(e)}")
         raise Exception(f"Error generating frequency table: {str(e)}")
 
-def generate_pie_chart(file_path, field):
+def generate_pie_chart(file_path, field, filters=None):
     """
     Generate a pie chart visualization for a field.
     
     Args:
         file_path (str): Path to the Excel file
         field (str): Field to visualize
+        filters (dict, optional): Dictionary of filters to apply {column: value}
         
     Returns:
         dict: Pie chart data
     """
     try:
+        import plotly.express as px
+        import plotly.io as pio
+        
         # Get frequency data
-        frequency_data = get_frequency_table(file_path, field)
+        frequency_data = get_frequency_table(file_path, field, filters=filters)
         
         # Limit the number of slices to 10 most frequent, group others
-        if len(frequency_data) > 10:
-            top_items = sorted(frequency_data, key=lambda x: x['count'], reverse=True)[:9]
-            other_items = sorted(frequency_data, key=lambda x: x['count'], reverse=True)[9:]
-            other_count = sum(item['count'] for item in other_items)
-            other_percentage = sum(item['percentage'] for item in other_items)
-            
-            top_items.append({
-                'value': 'Others',
-                'count': other_count,
-                'percentage': other_percentage
-            })
-            
-            frequency_data = top_items
+        frequency_data = limit_categories(frequency_data, PIE_CHART_MAX_SLICES)
         
         # Create pie chart with plotly
         labels = [str(item['value']) for item in frequency_data]
@@ -125,35 +221,27 @@ def generate_pie_chart(file_path, field):
         logger.error(f"Error generating pie chart: {str(e)}")
         raise Exception(f"Error generating pie chart: {str(e)}")
 
-def generate_bar_chart(file_path, field):
+def generate_bar_chart(file_path, field, filters=None):
     """
     Generate a bar chart visualization for a field.
     
     Args:
         file_path (str): Path to the Excel file
         field (str): Field to visualize
+        filters (dict, optional): Dictionary of filters to apply {column: value}
         
     Returns:
         dict: Bar chart data
     """
     try:
+        import plotly.express as px
+        import plotly.io as pio
+        
         # Get frequency data
-        frequency_data = get_frequency_table(file_path, field)
+        frequency_data = get_frequency_table(file_path, field, filters=filters)
         
         # Limit the number of bars to 20 most frequent, group others
-        if len(frequency_data) > 20:
-            top_items = sorted(frequency_data, key=lambda x: x['count'], reverse=True)[:19]
-            other_items = sorted(frequency_data, key=lambda x: x['count'], reverse=True)[19:]
-            other_count = sum(item['count'] for item in other_items)
-            other_percentage = sum(item['percentage'] for item in other_items)
-            
-            top_items.append({
-                'value': 'Others',
-                'count': other_count,
-                'percentage': other_percentage
-            })
-            
-            frequency_data = top_items
+        frequency_data = limit_categories(frequency_data, BAR_CHART_MAX_BARS)
         
         # Sort by count
         frequency_data = sorted(frequency_data, key=lambda x: x['count'])
@@ -190,20 +278,24 @@ def generate_bar_chart(file_path, field):
         logger.error(f"Error generating bar chart: {str(e)}")
         raise Exception(f"Error generating bar chart: {str(e)}")
 
-def generate_treemap(file_path, field):
+def generate_treemap(file_path, field, filters=None):
     """
     Generate a treemap visualization for a field.
     
     Args:
         file_path (str): Path to the Excel file
         field (str): Field to visualize
+        filters (dict, optional): Dictionary of filters to apply {column: value}
         
     Returns:
         dict: Treemap data
     """
     try:
+        import plotly.express as px
+        import plotly.io as pio
+        
         # Get frequency data
-        frequency_data = get_frequency_table(file_path, field)
+        frequency_data = get_frequency_table(file_path, field, filters=filters)
         
         # If no data or empty frequency table, return a simple message
         if not frequency_data:
@@ -258,6 +350,153 @@ def generate_treemap(file_path, field):
         logger.error(f"Error generating treemap: {str(e)}")
         raise Exception(f"Error generating treemap: {str(e)}")
 
+def generate_time_series(file_path, field, interval=None, filters=None):
+    """
+    Generate a time series visualization for a datetime field.
+    
+    Args:
+        file_path (str): Path to the Excel file
+        field (str): Datetime field to visualize
+        interval (str, optional): Resampling interval, or None to pick one automatically
+        filters (dict, optional): Dictionary of filters to apply {column: value}
+        
+    Returns:
+        dict: Time series chart data
+    """
+    try:
+        import plotly.graph_objects as go
+        import plotly.io as pio
+        
+        series = get_time_series(file_path, field, interval=interval, filters=filters)
+        
+        if not series['timestamps']:
+            return {
+                'type': 'time_series',
+                'field': field,
+                'error': 'No date values available for time series visualization'
+            }
+        
+        # WebGL scatter keeps rendering fast even at the point cap
+        fig = go.Figure(data=go.Scattergl(
+            x=series['timestamps'],
+            y=series['counts'],
+            mode='lines',
+            name=field,
+            hovertemplate='%{x}<br>Count: %{y}<extra></extra>'
+        ))
+        
+        fig.update_layout(
+            title=f'{field} over time (per {series["interval"]})',
+            template='plotly_dark',
+            xaxis_title=field,
+            yaxis_title='Count'
+        )
+        
+        # Update layout for better appearance
+        fig.update_layout(
+            margin=dict(l=20, r=20, t=40, b=20),
+            font=dict(size=12)
+        )
+        
+        # Convert to JSON for frontend
+        chart_json = pio.to_json(fig)
+        
+        return {
+            'type': 'time_series',
+            'field': field,
+            'interval': series['interval'],
+            'data': json.loads(chart_json)
+        }
+    
+    except Exception as e:
+        logger.error(f"Error generating time series: {str(e)}")
+        raise Exception(f"Error generating time series: {str(e)}")
+
+def generate_crosstab_visualization(file_path, row_field, column_field, visualization_type, filters=None):
+    """
+    Generate a cross-tab visualization for a pair of fields.
+    
+    Args:
+        file_path (str): Path to the Excel file
+        row_field (str): Field shown on the y axis (heatmap) or x axis (bars)
+        column_field (str): Field whose categories form the heatmap columns or bar series
+        visualization_type (str): Type of visualization (heatmap, stacked_bar, grouped_bar)
+        filters (dict, optional): Dictionary of filters to apply {column: value}
+        
+    Returns:
+        dict: Visualization data that can be rendered by the frontend
+    """
+    try:
+        import plotly.graph_objects as go
+        import plotly.io as pio
+        
+        if visualization_type not in CROSSTAB_VISUALIZATION_TYPES:
+            raise ValueError(f"Unsupported cross-tab visualization type: {visualization_type}")
+        
+        crosstab = get_crosstab(file_path, row_field, column_field, filters=filters)
+        
+        # If no rows survive filtering there is nothing to plot
+        if crosstab['total'] == 0:
+            return {
+                'type': visualization_type,
+                'field': f'{row_field} × {column_field}',
+                'error': 'No data available for cross-tab visualization'
+            }
+        
+        title = f'{row_field} by {column_field}'
+        
+        if visualization_type == 'heatmap':
+            fig = go.Figure(data=go.Heatmap(
+                z=crosstab['counts'],
+                x=crosstab['column_labels'],
+                y=crosstab['row_labels'],
+                colorscale='Viridis',
+                hovertemplate=f'{row_field}: %{{y}}<br>{column_field}: %{{x}}<br>Count: %{{z}}<extra></extra>'
+            ))
+            fig.update_layout(
+                title=title,
+                template='plotly_dark',
+                xaxis_title=column_field,
+                yaxis_title=row_field,
+                yaxis=dict(autorange='reversed')
+            )
+        else:
+            # One bar series per column category, counts read down the cross-tab column
+            fig = go.Figure()
+            for column_index, column_label in enumerate(crosstab['column_labels']):
+                fig.add_trace(go.Bar(
+                    name=column_label,
+                    x=crosstab['row_labels'],
+                    y=[row[column_index] for row in crosstab['counts']]
+                ))
+            fig.update_layout(
+                title=title,
+                template='plotly_dark',
+                barmode='stack' if visualization_type == 'stacked_bar' else 'group',
+                xaxis_title=row_field,
+                yaxis_title='Count',
+                legend=dict(title=column_field)
+            )
+        
+        # Update layout for better appearance
+        fig.update_layout(
+            margin=dict(l=20, r=20, t=40, b=20),
+            font=dict(size=12)
+        )
+        
+        # Convert to JSON for frontend
+        chart_json = pio.to_json(fig)
+        
+        return {
+            'type': visualization_type,
+            'field': f'{row_field} × {column_field}',
+            'data': json.loads(chart_json)
+        }
+    
+    except Exception as e:
+        logger.error(f"Error generating cross-tab visualization: {str(e)}")
+        raise Exception(f"Error generating cross-tab visualization: {str(e)}")
+
 def get_plot_image(fig, format='png', width=800, height=600):
     """
     Convert a plotly figure to a base64 encoded image.
@@ -272,6 +511,8 @@ def get_plot_image(fig, format='png', width=800, height=600):
         str: Base64 encoded image
     """
     try:
+        import plotly.io as pio
+        
         img_bytes = pio.to_image(fig, format=format, width=width, height=height)
         encoded = base64.b64encode(img_bytes).decode('ascii')
         return f"data:image/{format};base64,{encoded}"